@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
 
 class Command(ABC):
-    def __init__(self, platform, args):
+    #raw_args is the argument text as typed, before shlex removed its quotes
+    def __init__(self, platform, args, raw_args=""):
         self.platform = platform
         self.args = args
+        self.raw_args = raw_args
 
     @abstractmethod
     def execute(self):
@@ -1,6 +1,6 @@
 import shlex
 
-from . import CreateCommand, EditCommand, DeleteCommand, SaveGraphCommand, FilterCommand, ClearCommand, HelpCommand, SearchCommand
+from . import CreateCommand, EditCommand, DeleteCommand, SaveGraphCommand, FilterCommand, EdgeFilterCommand, ClearCommand, HelpCommand, SearchCommand
 
 class CommandLine:
     def __init__(self, platform, file_path=None):
@@ -12,6 +12,7 @@ class CommandLine:
             "delete": DeleteCommand.DeleteCommand,
             "save-graph": SaveGraphCommand.SaveGraphCommand,
             "filter": FilterCommand.FilterCommand,
+            "filter-edge": EdgeFilterCommand.EdgeFilterCommand,
             "search": SearchCommand.SearchCommand,
             "clear":  ClearCommand.ClearCommand,
             "clear-filter":  ClearCommand.ClearCommand,
@@ -30,7 +31,9 @@ class CommandLine:
         if not CommandClass:
             return f"WARNING: Unknown command: {cmd_name}"
 
-        command_obj = CommandClass(self.platform, args)
+        parts = command_str.strip().split(None, 1)
+        raw_args = parts[1] if len(parts) > 1 else ""
+        command_obj = CommandClass(self.platform, args, raw_args)
         return command_obj.execute()
     
     @staticmethod
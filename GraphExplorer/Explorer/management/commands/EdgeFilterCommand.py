@@ -0,0 +1,12 @@
+from . import Command as Command
+from filters import EdgeFilter
+
+OPERATORS = (">=", "<=", "==", "!=", ">", "<")
+
+class EdgeFilterCommand(Command.Command):
+    def execute(self):
+        if len(self.args) != 3 or self.args[1] not in OPERATORS:
+            return "ERROR: Invalid edge filter. Use: filter-edge <attribute> <operator> <value>, e.g. filter-edge weight > 5"
+        new_filter = EdgeFilter(self.args[0], self.args[1], self.args[2])
+        self.platform.add_filter(new_filter)
+        return "Successfully added edge filter"
@@ -3,10 +3,29 @@ from graph_api import Node
 from . import Command as Command
 from . import CommandLine as CLI
 from filters import Filter, FilterFilter
+from filter_expression import ExpressionFilter
+
+OPERATORS = (">=", "<=", "==", "!=", ">", "<")
 
 class FilterCommand(Command.Command):
     def execute(self):
-        new_filter = FilterFilter(self.args[0],self.args[1],self.args[2])
+        if not self.args:
+            return "ERROR: Missing filter, e.g. filter age > 30 AND city == Belgrade"
+        if len(self.args) == 3 and self.args[1] in OPERATORS:
+            new_filter = FilterFilter(self.args[0],self.args[1],self.args[2])
+            self.platform.add_filter(new_filter)
+            return "Successfully added range filter"
+
+        try:
+            new_filter = ExpressionFilter(self.expression_text())
+        except ValueError as e:
+            return f"ERROR: Invalid filter expression: {e}"
         self.platform.add_filter(new_filter)
-        return f"Successfully added range filter"
+        return "Successfully added filter expression"
 
+    #The expression is parsed from the text as typed, shlex would have dropped the quotes
+    #around values like "Novi Sad". A single argument is an expression quoted as a whole.
+    def expression_text(self):
+        if len(self.args) == 1 or not self.raw_args:
+            return " ".join(self.args)
+        return self.raw_args
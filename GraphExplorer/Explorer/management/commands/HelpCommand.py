@@ -7,9 +7,10 @@ class HelpCommand(Command.Command):
             "2. edit - Use to edit an already existing node/edge\n"
             "3. delete - Use to delete node/edge\n"
             "4. save-graph - Use to save graph into database\n"
-            "5. filter - Use to filter through nodes\n"
-            "6. search - Use to search through graph\n"
-            "7. clear - Use to clear entire graph\n"
-            "8. clear-filter - Use to clear all filters from the graph\n"
-            "9. help - Show this help message\n"
+            "5. filter - Use to filter through nodes, e.g. filter age > 30 AND (city == \"Novi Sad\" OR NOT role == guest)\n"
+            "6. filter-edge - Use to filter through edges, e.g. filter-edge weight > 5\n"
+            "7. search - Use to search through graph\n"
+            "8. clear - Use to clear entire graph\n"
+            "9. clear-filter - Use to clear all filters from the graph\n"
+            "10. help - Show this help message\n"
         ]
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Server-sent events fan-out of tree view revisions.
+
+Runs under ASGI (GraphExplorer/asgi.py): every open stream is a coroutine
+waiting on its own asyncio.Event, so idle clients cost no thread and no CPU.
+Platform updates happen in worker threads and only wake the event loop.
+Events are serialized once per revision and shared by all subscribers; a
+subscriber that falls behind is not queued up, the next time it is woken it
+gets one event from the revision it has to the latest one.
+"""
+import asyncio
+import json
+
+#Seconds between comment lines sent to idle streams, so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+class TreeViewBroadcaster(object):
+
+    def __init__(self) -> None:
+        self._loop = None
+        self._subscribers = set()   #asyncio.Event per open stream, set when there is something new
+        self._forest = None
+        self._snapshot = None       #(revision, data) of the last published tree
+        self._deltas = {}           #revision a client is at -> (revision, data) bringing it to the latest one
+
+    #Called from the thread that changed the tree, right after the change
+    def publish(self, forest) -> None:
+        revision = forest.revision
+        self._snapshot = (revision, json.dumps({
+            "type": "snapshot",
+            "revision": revision,
+            "selected_id": forest.selected_id,
+            "total": forest.row_count(),
+        }))
+        self._forest = forest
+        self._deltas = {}
+        if self._loop is not None and self._subscribers:
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        for updated in self._subscribers:
+            updated.set()
+
+    #(revision, data) taking a client at revision to the latest tree, data is None if it is up to date
+    def _event_since(self, revision):
+        snapshot = self._snapshot
+        if revision is None:
+            return snapshot
+        if revision == snapshot[0]:
+            return revision, None
+        deltas = self._deltas
+        event = deltas.get(revision)
+        if event is None:
+            current, ops = self._forest.changes_since(revision)
+            if ops is None:
+                event = snapshot
+            elif not ops:
+                event = (current, None)
+            else:
+                event = (current, json.dumps({"type": "delta", "from": revision, "revision": current, "ops": ops}))
+            deltas[revision] = event
+        return event
+
+    async def stream(self, last_event_id=None):
+        """
+        SSE lines for one client: a snapshot on connect, or deltas from last_event_id when the
+        client reconnects and the forest still has them, then one event per wake-up.
+        """
+        self._loop = asyncio.get_running_loop()
+        updated = asyncio.Event()
+        self._subscribers.add(updated)
+        revision = last_event_id
+        try:
+            while True:
+                revision, data = self._event_since(revision)
+                if data is not None:
+                    yield f"id: {revision}\ndata: {data}\n\n"
+                try:
+                    await asyncio.wait_for(updated.wait(), KEEPALIVE_SECONDS)
+                    updated.clear()
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            self._subscribers.discard(updated)
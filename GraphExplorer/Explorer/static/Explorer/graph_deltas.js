@@ -0,0 +1,154 @@
+// Keeps the graph of a visualizer layout up to date, included by the layouts after their own script:
+//     <script src="/static/Explorer/graph_deltas.js" data-delta-port="DELTA_PORT"></script>
+// The layout provides nodes, links, isDirected, nodeElements, simulation,
+// revisualize, updateGraph, selectNode and deselectNodes.
+//
+// Changes are pushed over a WebSocket (see delta_channel.py) as deltas between graph versions.
+// Without the socket, or when a delta doesn't start from the version shown, the whole graph is fetched.
+const deltaPort = JSON.parse(document.currentScript.dataset.deltaPort);
+let graphVersion = null;
+let deltaSocket = null;
+let pendingFetch = 0;
+
+function fetchGraph() {
+    const request = ++pendingFetch;
+    fetch(`/api/graph/data/`, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then((res) => res.json())
+    .then((data) => {
+        if (request !== pendingFetch)
+            return; // A newer fetch was started meanwhile
+        graphVersion = data.version;
+        isDirected = data.directed;
+        revisualize(data.nodes, data.links)
+        loadSelection()
+    })
+}
+
+function loadSelection() {
+    fetch(`select/`, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then((res) => {
+        if (res.ok){
+            return res.json()
+        }else{
+            throw new Error("Error 404")
+        }
+    })
+    .then((data) => selectNode(data.node.id))
+    .catch(() => deselectNodes())
+}
+
+function linkKey(sourceId, targetId) {
+    return JSON.stringify([sourceId, targetId]);
+}
+
+// Ops carry the current state of a node or link, new nodes start next to a node they link to
+function applyOps(ops) {
+    const byId = new Map(nodes.map(n => [n.id, n]));
+    const byKey = new Map(links.map(l => [linkKey(l.source.id, l.target.id), l]));
+    const removedNodes = new Set();
+    const removedLinks = new Set();
+    const changedNodes = new Set();
+    for (const op of ops) {
+        if (op.op === 'node') {
+            const attributes = op.node.attributes;
+            const existing = byId.get(attributes.id);
+            if (existing) {
+                existing.attributes = { ...attributes };
+            } else {
+                const node = { id: attributes.id, attributes: { ...attributes } };
+                byId.set(node.id, node);
+                nodes.push(node);
+            }
+            changedNodes.add(attributes.id);
+        } else if (op.op === 'remove_node') {
+            byId.delete(op.id);
+            removedNodes.add(op.id);
+        } else if (op.op === 'link') {
+            const key = linkKey(op.source, op.target);
+            const existing = byKey.get(key);
+            if (existing) {
+                existing.attrs = op.attrs || {};
+                continue;
+            }
+            const s = byId.get(op.source);
+            const t = byId.get(op.target);
+            if (!s || !t)
+                continue;
+            if (s.x === undefined && t.x !== undefined) { s.x = t.x + Math.random() * 100 - 50; s.y = t.y + Math.random() * 100 - 50; }
+            if (t.x === undefined && s.x !== undefined) { t.x = s.x + Math.random() * 100 - 50; t.y = s.y + Math.random() * 100 - 50; }
+            const link = { source: s, target: t, attrs: op.attrs || {} };
+            byKey.set(key, link);
+            links.push(link);
+            removedLinks.delete(key);
+        } else if (op.op === 'remove_link') {
+            removedLinks.add(linkKey(op.source, op.target));
+        }
+    }
+    if (removedNodes.size)
+        nodes = nodes.filter(n => !removedNodes.has(n.id));
+    if (removedNodes.size || removedLinks.size)
+        links = links.filter(l => !removedNodes.has(l.source.id) && !removedNodes.has(l.target.id)
+                                  && !removedLinks.has(linkKey(l.source.id, l.target.id)));
+
+    updateGraph();
+    // Edited nodes may have changed size
+    nodeElements.filter(d => changedNodes.has(d.id)).select("div").each(function(d) {
+        d.width = this.offsetWidth;
+        d.height = this.offsetHeight;
+    });
+    nodeElements.attr("width", d => d.width)
+                .attr("height", d => d.height);
+    // The rest of the layout stays where it was
+    simulation.alpha(0.3).restart();
+}
+
+function connectDeltas() {
+    if (deltaPort === null)
+        return;
+    const socket = new WebSocket(`ws://${location.hostname}:${deltaPort}`);
+    socket.onopen = () => { deltaSocket = socket; };
+    socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'select') {
+            if (message.node_id === null)
+                deselectNodes();
+            else
+                selectNode(message.node_id);
+        } else if (message.type === 'hello') {
+            if (graphVersion !== null && message.version !== graphVersion)
+                fetchGraph(); // Changed between loading the graph and connecting
+        } else if (message.type === 'delta' && message.from === graphVersion) {
+            graphVersion = message.version;
+            applyOps(message.ops);
+        } else {
+            fetchGraph();
+        }
+    };
+    socket.onclose = () => {
+        deltaSocket = null;
+        setTimeout(connectDeltas, 2000);
+    };
+}
+
+fetchGraph();
+connectDeltas();
+
+document.addEventListener("graphStructureChanged", () => {
+    if (deltaSocket === null)
+        fetchGraph();
+})
+
+document.addEventListener("nodeSelectionChanged", ()=>{
+    if (deltaSocket === null)
+        loadSelection(); // Otherwise it comes over the socket
+})
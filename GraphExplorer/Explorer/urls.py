@@ -7,6 +7,8 @@ urlpatterns = [
     path('run-command/', views.run_command, name='run_command'),
     path('partial-graph', views.partial_graph_view, name='partial_graph'),
     path('treeview/updates', views.sse_treeview_updates, name='treeview_updates'),
+    path('treeview/rows', views.treeview_rows, name='treeview_rows'),
+    path('treeview/attributes', views.treeview_attributes, name='treeview_attributes'),
     path('treeview/expand', views.expand_treeview_node, name='expand_treeview'),
     path('treeview/collapse', views.collapse_treeview_node, name='expand_treeview'),
     path('select/<str:item_id>/', views.select_node, name='select_node'),
@@ -1,9 +1,9 @@
-import time
 from django.shortcuts import render
 from block_visualizer import BlockVisualizer
 from data_source_json import JSONDataSource
 from simple_visualizer import SimpleVisualizer
 from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+import hashlib
 import json
 from django.views.decorators.csrf import csrf_exempt
 
@@ -16,6 +16,7 @@ import tempfile
 
 from .management.commands.CommandLine import CommandLine
 from .management.commands import CreateCommand, EditCommand, DeleteCommand, SaveGraphCommand
+from .sse import TreeViewBroadcaster
 
 
 kwargs = {"file_path": "../assets/large_graph.json"}
@@ -79,6 +80,8 @@ def filter_graph(request):
             return JsonResponse({"output": "Invalid request"}, status=400)
     
         html = cli_instance.process_command(filter_filter)
+        if isinstance(html, str) and html.startswith("ERROR"):
+            return JsonResponse({"output": html}, status=400)
     return JsonResponse({"main_view": html})
 
 @csrf_exempt
@@ -100,49 +103,72 @@ def remove_filter(request):
         platform.remove_filter(index)
     return JsonResponse({"success": True})
 
+#Answers with 304 when the browser already has this version of the content, it revalidates every time
+def _revalidated_response(request, etag, content, content_type):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponse(status=304, headers=headers)
+    return HttpResponse(content, content_type=content_type, headers=headers)
+
+#The visualizer shell holds no graph data, so it only changes with the visualizer
 @csrf_exempt
 def partial_graph_view(request):
     html = platform.generate_main_view()
-    return HttpResponse(html)
+    etag = '"%s"' % hashlib.sha1(html.encode()).hexdigest()
+    return _revalidated_response(request, etag, html, "text/html")
 
 #TreeView stuff
 
-#list of callbacks for SSE
-_graph_update_listeners = []
+#Fans tree view revisions out to the SSE streams
+_treeview_broadcaster = TreeViewBroadcaster()
+_treeview_broadcaster.publish(platform.forestView)
+
+#Largest window of rows a client can ask for at once
+MAX_TREE_ROWS = 500
 
+#Serializes the new tree revision once, open streams are woken and send it from the event loop
 def notify_graph_update():
-    data = json.dumps(platform.get_tree_view())
-    for callback in _graph_update_listeners:
-        callback(data)
+    _treeview_broadcaster.publish(platform.forestView)
 
-#reloads the treeview when the graph is updated
-def sse_treeview_updates(request):
-    def event_stream():
-        last_data = None
+#The selection travels in the same revision stream, as a select op with the path to the node
+def notify_selection(node_id, path):
+    _treeview_broadcaster.publish(platform.forestView)
 
-        # Define a callback to push updates
-        data_queue = []
+platform.attach_update_listener(notify_graph_update)
+platform.attach_selection_listener(notify_selection)
 
-        def listener(new_data):
-            data_queue.append(new_data)
+def _last_event_id(request):
+    try:
+        return int(request.headers.get("Last-Event-ID"))
+    except (TypeError, ValueError):
+        return None
 
-        _graph_update_listeners.append(listener)
+#Streams the tree view revisions: a snapshot on connect, deltas after that.
+#A reconnecting client (Last-Event-ID) resumes with deltas if the forest still has them.
+async def sse_treeview_updates(request):
+    stream = _treeview_broadcaster.stream(_last_event_id(request))
+    return StreamingHttpResponse(stream, content_type='text/event-stream', headers={"Cache-Control": "no-cache"})
 
+def treeview_rows(request):
+    if request.method == "GET":
         try:
-            initial_data = json.dumps(platform.get_tree_view())
-            yield f"data: {initial_data}\n\n"
-            
-            while True:
-                if data_queue:
-                    # pop the latest update
-                    data = data_queue.pop(0)
-                    yield f"data: {data}\n\n"
-                else:
-                    time.sleep(0.1)  # small sleep to avoid busy loop
-        finally:
-            _graph_update_listeners.remove(listener)
-
-    return StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+            offset = max(int(request.GET.get("offset", 0)), 0)
+            limit = min(max(int(request.GET.get("limit", 100)), 0), MAX_TREE_ROWS)
+        except ValueError:
+            return JsonResponse({"output": "Invalid request"}, status=400)
+
+        return JsonResponse(platform.get_tree_view(offset, limit), status=200)
+
+    return JsonResponse({"output": "Invalid method"}, status=405)
+
+def treeview_attributes(request):
+    if request.method == "GET":
+        attributes = platform.get_node_attributes(request.GET.get("node_id", ""))
+        if attributes is None:
+            return JsonResponse({}, status=404)
+        return JsonResponse({"attributes": attributes}, status=200)
+
+    return JsonResponse({"output": "Invalid method"}, status=405)
 
 @csrf_exempt
 def expand_treeview_node(request):
@@ -270,11 +296,12 @@ def delete_vertex(request):
 
     return JsonResponse({"output": "Invalid method"}, status=405)
 
+#Serialized once per graph version, the tag of the serialization is the ETag
 @csrf_exempt
 def get_graph_data(request):
     if request.method == "GET":
-        data = platform.get_graph_data()
-        return JsonResponse(data, status=200)
+        tag, data = platform.get_graph_json()
+        return _revalidated_response(request, f'"{tag}"', data, "application/json")
     return JsonResponse({"output": "Invalid method"}, status=405)
 
 
@@ -2,6 +2,8 @@
 ASGI config for GraphExplorer project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+runserver serves it through daphne (see INSTALLED_APPS), so the tree view
+update streams (Explorer/sse.py) are coroutines instead of worker threads.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -31,6 +31,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    #Makes runserver serve the ASGI application, the tree view stream is an async view
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -70,6 +72,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'GraphExplorer.wsgi.application'
+ASGI_APPLICATION = 'GraphExplorer.asgi.application'
 
 
 # Database
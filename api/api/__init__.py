@@ -1 +1,3 @@
-from .graph_api import Node, Graph, GraphVisualizer
\ No newline at end of file
+from .graph_api import Node, Graph, GraphVisualizer, GraphChange, FilteredGraphView
+from .graph_snapshot import GraphSnapshot
+from .delta_visualizer import DeltaGraphVisualizer
@@ -0,0 +1,287 @@
+from collections import deque
+
+from traversal import BOTH, bfs_tree, component_labels
+
+
+class ComponentIndex(object):
+    """
+    Weakly connected components of a Graph or FilteredGraphView, kept up to date incrementally.
+
+    Every vertex carries the label of its component. Insertions are unions by
+    size: the smaller component is relabelled into the larger one. Deletions
+    are lazy: they only record their endpoints as suspects of the component,
+    and on the next query the suspects are searched from in parallel, one
+    breadth-first search each, merging searches that meet. Searches that run
+    out of vertices have found a piece that broke off and only that piece is
+    relabelled, so the cost depends on the small side of a split, not on the
+    size of the component.
+    Every component also knows its first vertex, the one added earliest,
+    which ForestView uses as the root of its tree. The first vertices that
+    came and went are recorded as they change, so root_changes() can hand
+    them out without looking at the other components, and path() gives the way
+    down to any vertex from a breadth-first tree of the component, kept until
+    an edge or a vertex of the component changes.
+    """
+
+    def __init__(self, graph) -> None:
+        self.graph = graph
+        self._component = {}    #vertex id -> component label
+        self._members = {}      #component label -> set of vertex ids
+        self._first = {}        #component label -> member with the lowest order, None until a flush finds it again
+        self._stale = set()     #component labels whose first vertex was removed or broke off, found again on the next flush
+        self._root_changes = {} #(order, first vertex) -> +1 added or -1 removed, since root_changes() was called
+        self._order = {}        #vertex id -> insertion number
+        self._next_order = 0
+        self._next_label = 0
+        self._suspects = {}     #component label -> vertices next to deletions in it
+        self._parents = {}      #component label -> vertex id -> parent in a BFS tree from the first vertex
+        self._build()
+
+    def _build(self) -> None:
+        snapshot = self.graph.freeze()
+        for order, (vid, label) in enumerate(zip(snapshot.ids, component_labels(snapshot))):
+            if label not in self._members:
+                self._members[label] = set()
+                self._first[label] = vid
+            self._members[label].add(vid)
+            self._component[vid] = label
+            self._order[vid] = order
+        self._next_order = len(snapshot)
+        self._next_label = len(self._members)
+
+    def __contains__(self, vid) -> bool:
+        return vid in self._component
+
+    def _new_component(self, members: set) -> int:
+        label = self._next_label
+        self._next_label += 1
+        for vid in members:
+            self._component[vid] = label
+        self._members[label] = members
+        self._first[label] = None
+        self._set_first(label, min(members, key=self._order.__getitem__))
+        return label
+
+    #Counts first vertices in and out, a vertex that left and came back within one batch cancels out
+    def _root_changed(self, order: int, vid, change: int) -> None:
+        key = (order, vid)
+        count = self._root_changes.get(key, 0) + change
+        if count:
+            self._root_changes[key] = count
+        else:
+            del self._root_changes[key]
+
+    def _set_first(self, label: int, vid) -> None:
+        first = self._first[label]
+        if first == vid:
+            return
+        if first is not None:
+            self._root_changed(self._order[first], first, -1)
+        self._first[label] = vid
+        self._root_changed(self._order[vid], vid, 1)
+
+    def _union(self, a, b) -> None:
+        label_a, label_b = self._component[a], self._component[b]
+        if label_a == label_b:
+            return
+        if len(self._members[label_a]) < len(self._members[label_b]):
+            label_a, label_b = label_b, label_a
+        moved = self._members.pop(label_b)
+        for vid in moved:
+            self._component[vid] = label_a
+        self._members[label_a] |= moved
+        self._parents.pop(label_a, None)
+        self._parents.pop(label_b, None)
+        first_a, first_b = self._first[label_a], self._first.pop(label_b)
+        order = self._order
+        if label_a in self._stale or label_b in self._stale:
+            #The first vertex is found again on the next flush, the known ones stop being first until then
+            self._stale.discard(label_b)
+            self._stale.add(label_a)
+            self._first[label_a] = None
+            for first in (first_a, first_b):
+                if first is not None:
+                    self._root_changed(order[first], first, -1)
+        elif order[first_b] < order[first_a]:
+            self._root_changed(order[first_a], first_a, -1)
+            self._first[label_a] = first_b
+        else:
+            self._root_changed(order[first_b], first_b, -1)
+        suspects = self._suspects.pop(label_b, None)
+        if suspects:
+            self._suspects.setdefault(label_a, set()).update(suspects)
+
+    #Neighbours of vid in either direction, as currently visible in the graph
+    def _neighbors(self, vid):
+        yield from self.graph._edges.get(vid, ())
+        if self.graph._is_directed:
+            yield from self.graph._in_edges.get(vid, ())
+
+    #Adds a vertex and joins it with the indexed neighbours it already has in the graph
+    def add_vertex(self, vid) -> None:
+        if vid in self._component:
+            return
+        self._order[vid] = self._next_order
+        self._next_order += 1
+        self._new_component({vid})
+        for neighbor in self._neighbors(vid):
+            if neighbor in self._component:
+                self._union(vid, neighbor)
+
+    #Removes a vertex. Its remaining neighbours in the underlying graph become suspects,
+    #the edges of a deleted vertex are expected to be removed with remove_edge before.
+    def remove_vertex(self, vid) -> None:
+        label = self._component.pop(vid, None)
+        if label is None:
+            return
+        order = self._order.pop(vid)
+        self._parents.pop(label, None)
+        members = self._members[label]
+        members.discard(vid)
+        if self._first[label] == vid:
+            self._root_changed(order, vid, -1)
+            self._first[label] = None
+            self._stale.add(label)
+        if not members:
+            del self._members[label]
+            del self._first[label]
+            self._stale.discard(label)
+            self._suspects.pop(label, None)
+            return
+        source = getattr(self.graph, "graph", self.graph)
+        suspects = self._suspects.setdefault(label, set())
+        suspects.update(source._edges.get(vid, ()))
+        suspects.update(source._in_edges.get(vid, ()))
+
+    def add_edge(self, source, target) -> None:
+        if source in self._component and target in self._component:
+            #A shortcut inside the component can make the BFS tree paths longer than the shortest ones
+            self._parents.pop(self._component[source], None)
+            self._union(source, target)
+
+    def remove_edge(self, source, target) -> None:
+        label = self._component.get(source)
+        if label is not None and label == self._component.get(target):
+            self._suspects.setdefault(label, set()).update((source, target))
+            self._parents.pop(label, None)
+
+    def _flush(self) -> None:
+        while self._suspects:
+            label, suspects = self._suspects.popitem()
+            if label in self._members:
+                self._split(label, suspects)
+                if self._component.get(self._first[label]) != label:
+                    #The first vertex went with a piece that broke off
+                    self._stale.add(label)
+        while self._stale:
+            label = self._stale.pop()
+            self._set_first(label, min(self._members[label], key=self._order.__getitem__))
+
+    #Searches from every suspect at once until at most one search is still running.
+    #Each finished search covered a whole piece of the component, which gets a new label.
+    #Follows the live adjacency instead of a snapshot, which would be rebuilt for the whole graph after every deletion.
+    def _split(self, label: int, suspects: set) -> None:
+        members = self._members[label]
+        starts = [vid for vid in suspects if vid in members]
+        if len(starts) < 2:
+            return
+
+        owner = {vid: i for i, vid in enumerate(starts)}
+        merged = list(range(len(starts)))     #search -> search it was merged into
+        pieces = [{vid} for vid in starts]
+        frontiers = [deque((vid,)) for vid in starts]
+        running = set(range(len(starts)))
+
+        def find(search):
+            while merged[search] != search:
+                merged[search] = merged[merged[search]]
+                search = merged[search]
+            return search
+
+        while len(running) > 1:
+            for search in list(running):
+                if search not in running:
+                    continue
+                frontier = frontiers[search]
+                if not frontier:
+                    running.discard(search)
+                    continue
+                current = frontier.popleft()
+                for neighbor in self._neighbors(current):
+                    if neighbor not in members:
+                        continue
+                    search = find(search)
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = search
+                        pieces[search].add(neighbor)
+                        frontiers[search].append(neighbor)
+                        continue
+                    other = find(other)
+                    if other != search:
+                        #The searches met, the smaller one is folded into the larger one
+                        if len(pieces[other]) > len(pieces[search]):
+                            search, other = other, search
+                        merged[other] = search
+                        pieces[search] |= pieces[other]
+                        frontiers[search].extend(frontiers[other])
+                        running.discard(other)
+                        running.add(search)
+
+        finished = [search for search in range(len(starts)) if find(search) == search and search not in running]
+        if not running:
+            #Every piece was found, the largest one keeps the label
+            finished.remove(max(finished, key=lambda search: len(pieces[search])))
+        for search in finished:
+            members -= pieces[search]
+            self._new_component(pieces[search])
+
+    def representative(self, vid):
+        """First vertex of vid's component."""
+        self._flush()
+        return self._first[self._component[vid]]
+
+    def path(self, vid) -> list:
+        """Vertex ids on a shortest path from the first vertex of vid's component to vid, edges taken in either direction."""
+        self._flush()
+        label = self._component[vid]
+        parents = self._parents.get(label)
+        if parents is None:
+            parents = self._parents[label] = bfs_tree(self.graph, self._first[label], BOTH)
+        path = [vid]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return path
+
+    def size(self, vid) -> int:
+        self._flush()
+        return len(self._members[self._component[vid]])
+
+    def count(self) -> int:
+        self._flush()
+        return len(self._members)
+
+    def roots(self) -> list:
+        """
+        First vertex of every component, in the order the vertices were added.
+        Sorts all of them, callers that keep a copy follow root_changes() afterwards.
+        """
+        self._flush()
+        return sorted(self._first.values(), key=self._order.__getitem__)
+
+    def order(self, vid) -> int:
+        """Insertion number of vid, first vertices are sorted by it."""
+        return self._order[vid]
+
+    def root_changes(self) -> tuple:
+        """
+        (removed, added) first vertices since the last call, or since the index was built,
+        each a sorted list of (order, vertex id) pairs. A vertex that was removed and added
+        again has a new order, so it shows up in both.
+        """
+        self._flush()
+        changes, self._root_changes = self._root_changes, {}
+        removed = sorted(key for key, count in changes.items() if count < 0)
+        added = sorted(key for key, count in changes.items() if count > 0)
+        return removed, added
@@ -0,0 +1,191 @@
+"""
+WebSocket channel that pushes graph changes to the visualizer running in the browser.
+
+Visualizers publish once the platform has updated the view, so a burst of
+edits goes out as one message. The nodes and links it touched are read from the
+graph's change log, and ops carry the current state of each of them, resolved
+against the view, which keeps filtered views right without re-sending the
+graph. Messages are versioned by the graph version; a client whose version
+doesn't match the "from" of a delta, or that gets a reset, fetches the whole
+graph once (/api/graph/data/).
+
+The server runs on its own event loop in a daemon thread, started when a
+visualizer first renders its page. It listens on GRAPH_DELTA_HOST and
+GRAPH_DELTA_PORT and only accepts pages served from GRAPH_DELTA_ORIGINS
+(comma separated, the explorer's runserver address by default). websockets is
+optional: without it, or when the port is taken, the channel does nothing and
+clients keep fetching.
+"""
+import asyncio
+import os
+import threading
+
+from graph_api import VERTEX_ADDED, VERTEX_EDITED, VERTEX_REMOVED
+from graph_json import dumps
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+DELTA_HOST = os.environ.get("GRAPH_DELTA_HOST", "localhost")
+DELTA_PORT = int(os.environ.get("GRAPH_DELTA_PORT", "8765"))
+#Origin headers of the pages allowed to connect
+DELTA_ORIGINS = [origin.strip() for origin in
+                 os.environ.get("GRAPH_DELTA_ORIGINS", "http://localhost:8000,http://127.0.0.1:8000").split(",")
+                 if origin.strip()]
+#Seconds start() waits for the server to listen
+DELTA_START_TIMEOUT = 2
+
+
+class GraphDeltaChannel(object):
+
+    def __init__(self, host: str = DELTA_HOST, port: int = DELTA_PORT, origins: list = None) -> None:
+        self.host = host
+        self.port = port
+        self.origins = list(DELTA_ORIGINS if origins is None else origins)
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._failed = False        #the server couldn't listen, e.g. the port is taken
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._view = None           #the graph view the last message was computed from
+        self._version = None        #its version at that time
+        self._visible = set()       #node ids the clients are showing
+        self._selected_id = None
+
+    @property
+    def enabled(self) -> bool:
+        return websockets is not None and not self._failed
+
+    def start(self) -> bool:
+        """Starts the server thread on first use and waits until it listens. Returns whether clients can connect."""
+        if not self.enabled or self._thread is not None:
+            return self.enabled
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="graph-delta-channel", daemon=True)
+        self._thread.start()
+        self._ready.wait(DELTA_START_TIMEOUT)
+        return self.enabled
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except OSError:
+            #The port is taken, clients of this process fall back to fetching the graph
+            self._failed = True
+            self._loop = None
+        finally:
+            self._ready.set()
+
+    #Connections from other origins are refused with 403, so other sites can't read the graph
+    async def _serve(self) -> None:
+        async with websockets.serve(self._handler, self.host, self.port, origins=self.origins):
+            self._ready.set()
+            await asyncio.Future()
+
+    async def _handler(self, websocket, *args) -> None:
+        self._clients.add(websocket)
+        try:
+            await websocket.send(dumps({"type": "hello", "version": self._version, "selected_id": self._selected_id}))
+            async for _ in websocket:
+                pass
+        finally:
+            self._clients.discard(websocket)
+
+    #Sends data to every client, from whichever thread changed the graph
+    def _send(self, message: dict) -> None:
+        if self._loop is None or not self._clients:
+            return
+        data = dumps(message)
+        self._loop.call_soon_threadsafe(self._broadcast, data)
+
+    def _broadcast(self, data: str) -> None:
+        websockets.broadcast(set(self._clients), data)
+
+    #Called when a whole view was sent to a client some other way (a rendered page),
+    #deltas are computed against it from now on
+    def reset(self, view) -> None:
+        with self._lock:
+            changed = self._view is not None and (self._view is not view or self._version != view.version)
+            self._view = view
+            self._version = view.version
+            self._visible = set(view._vertices)
+        if changed:
+            self._send({"type": "reset", "version": self._version})
+
+    def selection_changed(self, node_id) -> None:
+        self._selected_id = node_id
+        self._send({"type": "select", "node_id": node_id})
+
+    def publish(self, view) -> None:
+        """
+        Sends what changed since the last publish, or a reset if the view itself was replaced
+        or the change log no longer reaches back to the last published version.
+        """
+        with self._lock:
+            ops = self._ops(view) if self._view is view else None
+            if ops is None:
+                self._view = view
+                self._version = view.version
+                self._visible = set(view._vertices)
+                message = {"type": "reset", "version": self._version}
+            else:
+                if not ops and self._version == view.version:
+                    return
+                message = {"type": "delta", "from": self._version, "version": view.version, "ops": ops}
+                self._version = view.version
+        self._send(message)
+
+    #Ops for the nodes and links changed since the last published version, None when the log doesn't reach back to it
+    def _ops(self, view):
+        changes = getattr(view, "graph", view).changes_since(self._version)
+        if changes is None:
+            return None
+        nodes = set()
+        links = set()
+        for change in changes:
+            if change.type == VERTEX_ADDED or change.type == VERTEX_EDITED or change.type == VERTEX_REMOVED:
+                nodes.add(change.vertex_id)
+            else:
+                links.add((change.vertex_id, change.target_id))
+
+        vertices = view._vertices
+        edges = view._edges
+        visible = self._visible
+        ops = []
+        for node_id in nodes:
+            node = vertices.get(node_id)
+            if node is None:
+                if node_id in visible:
+                    visible.discard(node_id)
+                    ops.append({"op": "remove_node", "id": node_id})
+                continue
+            ops.append({"op": "node", "node": {"attributes": node._attributes}})
+            if node_id not in visible:
+                #Newly shown, e.g. it passes the filters after an edit: its links come with it
+                visible.add(node_id)
+                links.update((node_id, target) for target in edges.get(node_id, ()))
+                links.update((source, node_id) for source in view._in_edges.get(node_id, ()))
+        if not view._is_directed:
+            links.update([(target, source) for source, target in links])
+        for source, target in links:
+            attrs = edges.get(source, {}).get(target)
+            if attrs is None:
+                ops.append({"op": "remove_link", "source": source, "target": target})
+            else:
+                ops.append({"op": "link", "source": source, "target": target, "attrs": attrs})
+        return ops
+
+
+_channel = None
+
+
+def get_delta_channel() -> GraphDeltaChannel:
+    """The channel shared by all visualizers, its server is started by start()."""
+    global _channel
+    if _channel is None:
+        _channel = GraphDeltaChannel()
+    return _channel
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+from graph_api import Graph, Node, GraphVisualizer
+from delta_channel import get_delta_channel
+from page_template import PageTemplate
+
+
+#Read once per path, visualizers are created again on every page load
+@lru_cache(maxsize=None)
+def _layout(path: str) -> PageTemplate:
+    return PageTemplate(path, ("DELTA_PORT",))
+
+
+class DeltaGraphVisualizer(GraphVisualizer):
+    """
+    Visualizer whose page fetches the graph itself and is kept up to date over the
+    delta channel (delta_channel.py). Subclasses only provide the page: a template
+    with a DELTA_PORT placeholder, filled with the channel's port or null, that
+    includes the explorer's graph_deltas.js. The channel reads what changed from
+    the change log when the view is republished, so the node and link hooks have
+    nothing to do.
+    """
+
+    def __init__(self, layout_path: str):
+        self._channel = get_delta_channel()
+        self._layout = _layout(layout_path)
+
+    def visualize_graph(self, g: Graph, selected_node: Node) -> str:
+        #Deltas pushed over the channel start from the graph the page fetches
+        self._channel.reset(g)
+        return self._layout.render({"DELTA_PORT": str(self._channel.port) if self._channel.start() else "null"})
+
+    def add_node(self, node: Node):
+        pass
+
+    def edit_node(self, node: Node):
+        pass
+
+    def remove_node(self, node: Node):
+        pass
+
+    def add_link(self, id_source: str, id_target: str, **attrs):
+        pass
+
+    def edit_link(self, id_source: str, id_target: str, **attrs):
+        pass
+
+    def remove_link(self, id_source: str, id_target: str):
+        pass
+
+    def on_switched_from(self):
+        pass
+
+    def on_switched_to(self):
+        pass
+
+    def on_selection_changed(self, node: Node):
+        self._channel.selection_changed(node.get_id() if node is not None else None)
+
+    def revisualize_graph(self, graph: Graph):
+        self._channel.publish(graph)
@@ -1,7 +1,50 @@
+import heapq
+import itertools
+import sys
+from collections import deque
+from collections.abc import Mapping
 from datetime import datetime
 from abc import ABC, abstractmethod
+from typing import NamedTuple
+from graph_snapshot import GraphSnapshot
+from graph_index import AttributeIndex, TextIndex, numeric_value
+
+#Strings longer than this are unlikely to repeat, so they are not interned
+_INTERN_MAX_LENGTH = 64
+
+_ATTRIBUTE_TYPES = (str, int, float, datetime)
+
+#Dictionary-encodes repeated attribute keys and short string values,
+#so e.g. every type="member" attribute points at the same string object
+def _intern(value):
+    if type(value) is str and len(value) <= _INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+#Number of changes a Graph keeps in its change log
+CHANGE_LOG_SIZE = 10000
+
+#How many times an attribute is filtered on before Graph indexes it automatically
+AUTO_INDEX_THRESHOLD = 3
+
+#Types of changes recorded in the change log
+VERTEX_ADDED = "vertex_added"
+VERTEX_EDITED = "vertex_edited"
+VERTEX_REMOVED = "vertex_removed"
+EDGE_ADDED = "edge_added"
+EDGE_EDITED = "edge_edited"
+EDGE_REMOVED = "edge_removed"
+
+#One entry of the change log. For edge changes vertex_id is the source and target_id the target.
+class GraphChange(NamedTuple):
+    version: int
+    type: str
+    vertex_id: object
+    target_id: object = None
 
 class Node(object):
+    __slots__ = ("_attributes",)
+
     def __init__(self, id: str) -> None:
         self._attributes = {'id': id}
 
@@ -9,10 +52,10 @@ class Node(object):
         if attr_name == 'id':
             raise ValueError("The id attribute is reserved.")
         
-        if not isinstance(value, (str, int, float, datetime)):
+        if not isinstance(value, _ATTRIBUTE_TYPES):
             raise TypeError("Value is not a supported type")
 
-        self._attributes[attr_name] = value
+        self._attributes[_intern(attr_name)] = _intern(value)
 
     def remove_attribute(self, attr_name: str) -> bool:
         if attr_name == 'id':
@@ -31,21 +74,68 @@ class Node(object):
         return self._attributes['id']
     
 class Graph(object):
-    def __init__(self, directed: bool) -> None:
+    def __init__(self, directed: bool, change_log_size: int = CHANGE_LOG_SIZE) -> None:
         self._vertices = {}
         #Dict of dicts
         #Example: node1_id: {node2_id: {EDGE ATTRIBUTES}, node3_id: {EDGE ATTRIBUTES}}
         self._edges = {}
+        #Reverse of _edges, shares the same attribute dicts
+        #Example: node2_id: {node1_id: {EDGE ATTRIBUTES}}
+        self._in_edges = {}
         self._is_directed = directed
         self._filters = []
+        #Id allocation for create_vertex: counter plus a min-heap of freed ids
+        self._next_id = 1
+        self._free_ids = []
+        #Incremented on every mutation, the last change_log_size changes are kept in _changes
+        self.version = 0
+        self._changes = deque(maxlen=change_log_size)
+        #Cached read-only CSR copy, rebuilt when the version moves on
+        self._snapshot = None
+        #attribute name -> AttributeIndex, plus how often unindexed attributes were queried
+        self._indexes = {}
+        self._attribute_queries = {}
+        #edge attribute name -> AttributeIndex keyed by (source id, target id)
+        self._edge_indexes = {}
+        #Full-text index for searches, built on the first search
+        self._text_index = None
 
     def add_vertex(self, vertex: Node) -> bool:
         if vertex.get_id() in self._vertices:
             return False
         
         self._vertices[vertex.get_id()] = vertex
+        self._update_indexes(vertex.get_id(), vertex._attributes)
+        self._record(VERTEX_ADDED, vertex.get_id())
         return True
 
+    #Adds many vertices at once from an iterable of (id, attributes dict).
+    #The whole batch is validated before anything is inserted; ids that already
+    #exist are skipped like in add_vertex. Returns the number of vertices added.
+    def add_vertices(self, vertices) -> int:
+        existing = self._vertices
+        batch = {}
+        for vid, attrs in vertices:
+            if vid in existing or vid in batch:
+                continue
+            record = {'id': vid}
+            if attrs:
+                for key, value in attrs.items():
+                    if key == 'id':
+                        raise ValueError("The id attribute is reserved.")
+                    if not isinstance(value, _ATTRIBUTE_TYPES):
+                        raise TypeError("Value is not a supported type")
+                    record[_intern(key)] = _intern(value)
+            node = Node.__new__(Node)
+            node._attributes = record
+            batch[vid] = node
+
+        existing.update(batch)
+        for vid, node in batch.items():
+            self._update_indexes(vid, node._attributes)
+            self._record(VERTEX_ADDED, vid)
+        return len(batch)
+
     def edit_vertex(self, vertex: Node) -> bool:
         vid = vertex.get_id()
         if vid not in self._vertices:
@@ -57,66 +147,250 @@ class Graph(object):
         for key,value in vertex.get_attributes().items():
             if key != 'id':
                 existing_node.set_attribute(key, value)
+        self._update_indexes(vid, existing_node._attributes)
+        self._record(VERTEX_EDITED, vid)
+        return True
+
+    #Sets one attribute of a vertex in the graph, keeping indexes and the change log up to date.
+    #Prefer this over calling set_attribute on a Node that is already in a graph.
+    def set_vertex_attribute(self, vertex_id, attr_name: str, value) -> bool:
+        node = self._vertices.get(vertex_id)
+        if node is None:
+            return False
+        node.set_attribute(attr_name, value)
+        self._update_indexes(vertex_id, node._attributes)
+        self._record(VERTEX_EDITED, vertex_id)
         return True
 
     def create_vertex(self) -> Node:
-        i = 1
-        while i in self._vertices:
-            i += 1
-        new_vertex = Node(i)
+        new_vertex = Node(self._allocate_id())
         self.add_vertex(new_vertex)
         return new_vertex
+
+    #Returns the smallest free integer id, reusing ids of deleted vertices first
+    def _allocate_id(self) -> int:
+        while self._free_ids:
+            i = heapq.heappop(self._free_ids)
+            if i not in self._vertices:
+                return i
+        while self._next_id in self._vertices:
+            self._next_id += 1
+        i = self._next_id
+        self._next_id += 1
+        return i
     
     def delete_vertex(self, vertex: Node) -> None:
         vid = vertex.get_id()
         if vid not in self._vertices:
             return False
         
-        if vid in self._edges:
-            del self._edges[vid]  # remove outgoing edges
-        # Remove edge from other edges adjacent
-        for src, targets in self._edges.items():
-            if vid in targets:
-                del targets[vid]
+        # remove outgoing edges
+        for target in self._edges.pop(vid, {}):
+            self._in_edges.get(target, {}).pop(vid, None)
+            self._remove_from_edge_indexes(vid, target)
+            self._record(EDGE_REMOVED, vid, target)
+        # remove incoming edges
+        for source in self._in_edges.pop(vid, {}):
+            if self._edges.get(source, {}).pop(vid, None) is not None:
+                self._remove_from_edge_indexes(source, vid)
+                self._record(EDGE_REMOVED, source, vid)
         # And then remove edge itself
         del self._vertices[vid]
+        self._remove_from_indexes(vid)
+        self._record(VERTEX_REMOVED, vid)
+        if type(vid) is int and 0 < vid < self._next_id:
+            heapq.heappush(self._free_ids, vid)
         return True
 
     def _add_edge(self, id1: str, id2: str, **attrs) -> None:
+        self._add_edge_record(id1, id2, attrs)
+
+    def _add_edge_record(self, id1: str, id2: str, attrs: dict) -> None:
         if id1 not in self._vertices or id2 not in self._vertices:
             return
 
         if id1 not in self._edges:
             self._edges[id1] = {}
         if id2 not in self._edges[id1]:
-            self._edges[id1][id2] = attrs
+            self._link(id1, id2, attrs)
     
     def _edit_edge(self, id1: str, id2: str, **attrs) -> None:
         if id1 not in self._edges:
             return
         if id2 not in self._edges[id1]:
             return
-        self._edges[id1][id2] = attrs
+        self._link(id1, id2, attrs)
+
+    #Stores the edge in both the outgoing and the incoming adjacency
+    def _link(self, id1, id2, attrs: dict) -> None:
+        targets = self._edges.setdefault(id1, {})
+        change = EDGE_EDITED if id2 in targets else EDGE_ADDED
+        targets[id2] = attrs
+        self._in_edges.setdefault(id2, {})[id1] = attrs
+        self._update_edge_indexes(id1, id2, attrs)
+        self._record(change, id1, id2)
+
+    def _unlink(self, id1, id2) -> dict:
+        attrs = self._edges[id1].pop(id2)
+        incoming = self._in_edges.get(id2)
+        if incoming is not None:
+            incoming.pop(id1, None)
+        self._remove_from_edge_indexes(id1, id2)
+        self._record(EDGE_REMOVED, id1, id2)
+        return attrs
+
+    def _update_indexes(self, vid, attributes: dict) -> None:
+        for index in self._indexes.values():
+            index.update(vid, attributes)
+        if self._text_index is not None:
+            self._text_index.update(vid, attributes)
+
+    def _remove_from_indexes(self, vid) -> None:
+        for index in self._indexes.values():
+            index.remove(vid)
+        if self._text_index is not None:
+            self._text_index.remove(vid)
+
+    def _update_edge_indexes(self, id1, id2, attributes: dict) -> None:
+        for index in self._edge_indexes.values():
+            index.update((id1, id2), attributes)
+
+    def _remove_from_edge_indexes(self, id1, id2) -> None:
+        for index in self._edge_indexes.values():
+            index.remove((id1, id2))
+
+    #Returns the full-text index over attribute keys and values, building it on first use
+    def text_index(self) -> TextIndex:
+        if self._text_index is None:
+            index = TextIndex()
+            for vid, node in self._vertices.items():
+                index.add(vid, node._attributes)
+            self._text_index = index
+        return self._text_index
+
+    #Indexes an attribute for == != < <= > >= lookups, see AttributeIndex
+    def create_index(self, attr_name: str) -> AttributeIndex:
+        index = self._indexes.get(attr_name)
+        if index is None:
+            index = AttributeIndex(attr_name)
+            for vid, node in self._vertices.items():
+                index.update(vid, node._attributes)
+            self._indexes[attr_name] = index
+        return index
+
+    def drop_index(self, attr_name: str) -> bool:
+        return self._indexes.pop(attr_name, None) is not None
+
+    def get_index(self, attr_name: str):
+        return self._indexes.get(attr_name)
+
+    #Indexes an edge attribute, the ids in the index are (source id, target id) pairs.
+    #Both directions of an undirected edge are indexed. Numeric strings are indexed as numbers.
+    def create_edge_index(self, attr_name: str) -> AttributeIndex:
+        index = self._edge_indexes.get(attr_name)
+        if index is None:
+            index = AttributeIndex(attr_name, numeric_value)
+            for source, targets in self._edges.items():
+                for target, attrs in targets.items():
+                    index.update((source, target), attrs)
+            self._edge_indexes[attr_name] = index
+        return index
+
+    def drop_edge_index(self, attr_name: str) -> bool:
+        return self._edge_indexes.pop(attr_name, None) is not None
+
+    def get_edge_index(self, attr_name: str):
+        return self._edge_indexes.get(attr_name)
+
+    #Returns the index for an attribute that is about to be filtered on.
+    #Attributes queried AUTO_INDEX_THRESHOLD times get indexed automatically,
+    #before that None is returned and the caller scans the vertices.
+    def index_for_query(self, attr_name: str):
+        index = self._indexes.get(attr_name)
+        if index is not None:
+            return index
+        count = self._attribute_queries.get(attr_name, 0) + 1
+        self._attribute_queries[attr_name] = count
+        if count >= AUTO_INDEX_THRESHOLD:
+            return self.create_index(attr_name)
+        return None
+
+    def _record(self, change_type: str, vertex_id, target_id=None) -> None:
+        self.version += 1
+        self._changes.append(GraphChange(self.version, change_type, vertex_id, target_id))
+
+    #Returns the changes made after the given version, oldest first.
+    #Returns None if some of them have already been dropped from the log,
+    #in which case the caller has to rebuild from the whole graph.
+    def changes_since(self, version: int):
+        if version >= self.version:
+            return []
+        if not self._changes or self._changes[0].version > version + 1:
+            return None
+        start = version + 1 - self._changes[0].version
+        return list(itertools.islice(self._changes, start, None))
+
+    #Returns an immutable CSR snapshot of the graph, rebuilt lazily after mutations.
+    #Attributes changed directly on a Node (instead of through edit_vertex) are not tracked.
+    def freeze(self) -> GraphSnapshot:
+        if self._snapshot is None or self._snapshot.version != self.version:
+            self._snapshot = GraphSnapshot(self)
+        return self._snapshot
 
     def delete_edge(self, node1_id: str, node2_id: str) -> bool:
        #If nodes ids are located in edges, we remove the edge from 1 node to another
         if node1_id in self._edges and node2_id in self._edges[node1_id]:
-            self._edges[node1_id].pop(node2_id,None)
+            self._unlink(node1_id, node2_id)
             # If undirected, remove reverse link too
             if not self._is_directed and node2_id in self._edges and node1_id in self._edges[node2_id]:
-              self._edges[node2_id].pop(node1_id, None)
+              self._unlink(node2_id, node1_id)
             return True
         return False
 
     def create_edge(self, id1: str, id2: str, **attrs) -> None:
-        self._add_edge(id1, id2, **attrs)
+        #Both directions of an undirected edge share one attribute record
+        record = {_intern(key): _intern(value) for key, value in attrs.items()}
+        self._add_edge_record(id1, id2, record)
         if not self._is_directed:
-            self._add_edge(id2, id1, **attrs)
+            self._add_edge_record(id2, id1, record)
+
+    #Adds many edges at once from an iterable of (source id, target id, attributes dict or None).
+    #Edges with a missing endpoint or that already exist are skipped like in create_edge.
+    #Returns the number of edges added.
+    def create_edges(self, edges) -> int:
+        vertices = self._vertices
+        outgoing = self._edges
+        incoming = self._in_edges
+        directed = self._is_directed
+        added = 0
+        for id1, id2, attrs in edges:
+            if id1 not in vertices or id2 not in vertices:
+                continue
+            record = {_intern(key): _intern(value) for key, value in attrs.items()} if attrs else {}
+            targets = outgoing.get(id1)
+            if targets is None:
+                targets = outgoing[id1] = {}
+            if id2 not in targets:
+                targets[id2] = record
+                incoming.setdefault(id2, {})[id1] = record
+                self._update_edge_indexes(id1, id2, record)
+                self._record(EDGE_ADDED, id1, id2)
+                added += 1
+            if not directed:
+                sources = outgoing.get(id2)
+                if sources is None:
+                    sources = outgoing[id2] = {}
+                if id1 not in sources:
+                    sources[id1] = record
+                    incoming.setdefault(id1, {})[id2] = record
+                    self._update_edge_indexes(id2, id1, record)
+                    self._record(EDGE_ADDED, id2, id1)
+        return added
 
     def edit_edge(self, old_source: str, new_target: str, **attrs) -> None:
         for target in list(self._edges.get(old_source, {})):
-            old_attrs = self._edges[old_source].pop(target)
-            self._edges[old_source][new_target] = {**old_attrs, **attrs}
+            old_attrs = self._unlink(old_source, target)
+            self._link(old_source, new_target, {**old_attrs, **attrs})
             break
 
     
@@ -148,12 +422,12 @@ class Graph(object):
             for outgoing_node_id in self._edges[node_id].keys():
                 outgoing.append(self._vertices[outgoing_node_id])
 
-        #Loop through all connections and take the incoming nodes
-        for src_id in self._edges.keys():
-            for trgt_id in self._edges[src_id].keys():
-                if trgt_id == node_id:
-                    incoming.append(self._vertices[src_id])
-        
+        #Loop through incoming connections and take the nodes
+        if node_id in self._in_edges:
+            for incoming_node_id in self._in_edges[node_id].keys():
+                incoming.append(self._vertices[incoming_node_id])
+
+
         return (outgoing, incoming)
     
     def add_filter(self, filter):
@@ -170,6 +444,106 @@ class Graph(object):
         return self._filters
         
 
+#Read-only adjacency (_edges or _in_edges) restricted to the vertices in mask and, when allowed is not None,
+#to the (source id, target id) pairs in allowed.
+#reverse marks an incoming adjacency, where the outer key is the edge target.
+class _MaskedAdjacency(Mapping):
+    def __init__(self, adjacency: dict, mask, allowed=None, reverse: bool = False) -> None:
+        self._adjacency = adjacency
+        self._mask = mask
+        self._allowed = allowed
+        self._reverse = reverse
+
+    def __getitem__(self, vid):
+        if vid not in self._mask:
+            raise KeyError(vid)
+        return _MaskedTargets(vid, self._adjacency[vid], self._mask, self._allowed, self._reverse)
+
+    def __contains__(self, vid) -> bool:
+        return vid in self._mask and vid in self._adjacency
+
+    def __iter__(self):
+        mask = self._mask
+        return (vid for vid in self._adjacency if vid in mask)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+class _MaskedTargets(Mapping):
+    def __init__(self, vid, targets: dict, mask, allowed=None, reverse: bool = False) -> None:
+        self._vid = vid
+        self._targets = targets
+        self._mask = mask
+        self._allowed = allowed
+        self._reverse = reverse
+
+    def _visible(self, other) -> bool:
+        if other not in self._mask:
+            return False
+        if self._allowed is None:
+            return True
+        return ((other, self._vid) if self._reverse else (self._vid, other)) in self._allowed
+
+    def __getitem__(self, vid):
+        if vid not in self._targets or not self._visible(vid):
+            raise KeyError(vid)
+        return self._targets[vid]
+
+    def __contains__(self, vid) -> bool:
+        return vid in self._targets and self._visible(vid)
+
+    def __iter__(self):
+        if self._allowed is None:
+            mask = self._mask
+            return (vid for vid in self._targets if vid in mask)
+        visible = self._visible
+        return (vid for vid in self._targets if visible(vid))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+class FilteredGraphView(object):
+    """
+    Read-only view of a Graph restricted to a subset of its vertices and,
+    optionally, of its edges.
+
+    Shares the Node objects and edge attribute dicts of the underlying graph
+    instead of copying them, and exposes the same read interface
+    (_vertices, _edges, _in_edges, get_connected_nodes, freeze) so it can be
+    passed wherever a filtered Graph used to be. Only edges with both
+    endpoints in the view are visible, and when edges is given only the
+    (source id, target id) pairs it contains.
+    """
+
+    def __init__(self, graph: Graph, vertices: dict, edges: set = None) -> None:
+        self.graph = graph
+        #id -> Node, the Nodes are the ones stored in graph
+        self._vertices = vertices
+        #set of visible (source id, target id) pairs, None when edges aren't filtered
+        self._allowed_edges = edges
+        self._edges = _MaskedAdjacency(graph._edges, vertices, edges)
+        self._in_edges = _MaskedAdjacency(graph._in_edges, vertices, edges, reverse=True)
+        self._is_directed = graph._is_directed
+        self._snapshot = None
+
+    @property
+    def version(self):
+        return self.graph.version
+
+    def get_connected_nodes(self, node_id: str):
+        vertices = self._vertices
+        allowed = self._allowed_edges
+        outgoing = [vertices[target] for target in
+                    _MaskedTargets(node_id, self.graph._edges.get(node_id, {}), vertices, allowed)]
+        incoming = [vertices[source] for source in
+                    _MaskedTargets(node_id, self.graph._in_edges.get(node_id, {}), vertices, allowed, True)]
+        return (outgoing, incoming)
+
+    def freeze(self) -> GraphSnapshot:
+        if self._snapshot is None or self._snapshot.version != self.version:
+            self._snapshot = GraphSnapshot(self)
+        return self._snapshot
+
 class GraphVisualizer(ABC):
     #Returns a string representing an HTML DOM visualization of the provided graph
     @abstractmethod
@@ -215,4 +589,4 @@ class GraphVisualizer(ABC):
 
     @abstractmethod
     def revisualize_graph(self, graph: Graph):
-        pass
\ No newline at end of file
+        pass
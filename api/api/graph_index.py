@@ -0,0 +1,216 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from functools import lru_cache
+
+
+#Values of different families can't be ordered against each other,
+#so each family gets its own sorted list
+def value_family(value):
+    if isinstance(value, (int, float)):
+        return float
+    if isinstance(value, datetime):
+        return datetime
+    return type(value)
+
+
+#Strings that read as finite numbers as int or float, other values unchanged.
+#Edge attributes given with --property on the CLI are stored as text.
+def numeric_value(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return number if math.isfinite(number) else value
+
+
+class AttributeIndex(object):
+    """
+    Secondary index over one vertex attribute.
+
+    Equality lookups use a hash map from value to vertex ids. Range lookups
+    bisect a sorted list of the distinct values of the same family
+    (numbers, strings, datetimes), so a query costs O(log n + k).
+    Values are indexed as returned by convert, if one is given.
+    """
+
+    def __init__(self, attr_name: str, convert=None) -> None:
+        self.attr_name = attr_name
+        self.convert = convert
+        self._values = {}    #vertex id -> indexed value
+        self._buckets = {}   #value -> set of vertex ids
+        self._sorted = {}    #family -> sorted list of distinct values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, vid, value) -> None:
+        if vid in self._values:
+            self.remove(vid)
+        self._values[vid] = value
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            self._buckets[value] = {vid}
+            insort(self._sorted.setdefault(value_family(value), []), value)
+        else:
+            bucket.add(vid)
+
+    def remove(self, vid) -> None:
+        if vid not in self._values:
+            return
+        value = self._values.pop(vid)
+        bucket = self._buckets[value]
+        bucket.discard(vid)
+        if not bucket:
+            del self._buckets[value]
+            values = self._sorted[value_family(value)]
+            del values[bisect_left(values, value)]
+
+    def families(self) -> list:
+        """Value families present in the index, see value_family."""
+        return [family for family, values in self._sorted.items() if values]
+
+    def update(self, vid, attributes: dict) -> None:
+        if self.attr_name in attributes:
+            value = attributes[self.attr_name]
+            self.add(vid, value if self.convert is None else self.convert(value))
+        else:
+            self.remove(vid)
+
+    def count(self, op: str, value) -> int:
+        """Number of vertices lookup(op, value) would return, without building the set."""
+        if op == "==":
+            return len(self._buckets.get(value, ()))
+        if op == "!=":
+            return len(self._values) - len(self._buckets.get(value, ()))
+        return sum(len(self._buckets[v]) for v in self._range(op, value))
+
+    def lookup(self, op: str, value) -> list:
+        """Ids of indexed vertices whose value satisfies `indexed op value`."""
+        if op == "==":
+            return list(self._buckets.get(value, ()))
+        if op == "!=":
+            return [vid for vid, v in self._values.items() if v != value]
+        result = []
+        for v in self._range(op, value):
+            result.extend(self._buckets[v])
+        return result
+
+    def _range(self, op: str, value) -> list:
+        values = self._sorted.get(value_family(value))
+        if not values:
+            return []
+        if op == "<":
+            return values[:bisect_left(values, value)]
+        if op == "<=":
+            return values[:bisect_right(values, value)]
+        if op == ">":
+            return values[bisect_right(values, value):]
+        if op == ">=":
+            return values[bisect_left(values, value):]
+        raise ValueError(f"Unsupported operator: {op}")
+
+
+#Attribute keys and many values repeat across vertices, so their grams are cached
+@lru_cache(maxsize=65536)
+def _split_grams(text: str, n: int) -> frozenset:
+    if len(text) <= n:
+        return frozenset((text,))
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class TextIndex(object):
+    """
+    Inverted n-gram index over the keys and values of vertex attributes, as strings.
+
+    Every value is split into its overlapping n-grams (strings shorter than n are
+    kept whole) and each gram maps to the ids of the vertices containing it.
+    Keys repeat across most vertices, so they map to their vertices directly and
+    are matched by scanning the few distinct keys.
+    candidates() returns a superset of the vertices having the query as a
+    substring of some key or value, which the caller then verifies.
+    """
+
+    def __init__(self, n: int = 3) -> None:
+        self.n = n
+        self._postings = {}   #value gram -> set of vertex ids
+        self._keys = {}       #attribute key as string -> set of vertex ids
+        self._entries = {}    #vertex id -> (keys, grams), needed to remove the vertex
+
+    def add(self, vid, attributes: dict) -> None:
+        self.remove(vid)
+        n = self.n
+        keys = [str(key) for key in attributes]
+        grams = set()
+        for value in attributes.values():
+            grams |= _split_grams(str(value), n)
+        self._entries[vid] = (keys, grams)
+
+        for key in keys:
+            bucket = self._keys.get(key)
+            if bucket is None:
+                self._keys[key] = {vid}
+            else:
+                bucket.add(vid)
+        postings = self._postings
+        for gram in grams:
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = {vid}
+            else:
+                bucket.add(vid)
+
+    def remove(self, vid) -> None:
+        entry = self._entries.pop(vid, None)
+        if entry is None:
+            return
+        keys, grams = entry
+        for table, items in ((self._keys, keys), (self._postings, grams)):
+            for item in items:
+                bucket = table[item]
+                bucket.discard(vid)
+                if not bucket:
+                    del table[item]
+
+    def update(self, vid, attributes: dict) -> None:
+        self.add(vid, attributes)
+
+    def candidates(self, text: str) -> set:
+        if not text:
+            return set(self._entries)
+
+        result = set()
+        for key, bucket in self._keys.items():
+            if text in key:
+                result |= bucket
+        return result | self._value_candidates(text)
+
+    def _value_candidates(self, text: str) -> set:
+        n = self.n
+        if len(text) < n:
+            #Short queries: every occurrence lies inside some gram
+            result = set()
+            for gram, bucket in self._postings.items():
+                if text in gram:
+                    result |= bucket
+            return result
+
+        buckets = []
+        for i in range(len(text) - n + 1):
+            bucket = self._postings.get(text[i:i + n])
+            if bucket is None:
+                return set()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        result = set(buckets[0])
+        for bucket in buckets[1:]:
+            result &= bucket
+            if not result:
+                break
+        return result
@@ -0,0 +1,46 @@
+"""
+JSON form of a graph as the visualizers draw it:
+    {"nodes": [{"attributes": {...}}], "links": [{"source", "target", "attrs"}], "directed", "version"}
+
+graph_json serializes a Graph or FilteredGraphView once per version and
+hands the same text to every caller until the graph changes, with a tag that
+is new for every serialization, also across restarts, so it can be an ETag.
+Like Graph.freeze, attributes changed directly on a Node are not noticed.
+"""
+import itertools
+import json
+import uuid
+import weakref
+from datetime import datetime
+
+_TAG_PREFIX = uuid.uuid4().hex[:12]
+_serials = itertools.count(1)
+#graph or view -> (version, tag, text)
+_cache = weakref.WeakKeyDictionary()
+
+
+#Dates the way Django's JsonResponse writes them, so both paths give the same text
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_default)
+
+
+def graph_data(graph) -> dict:
+    nodes = [{"attributes": node._attributes} for node in graph._vertices.values()]
+    links = [{"source": source, "target": target, "attrs": attrs}
+             for source, targets in graph._edges.items() for target, attrs in targets.items()]
+    return {"nodes": nodes, "links": links, "directed": graph._is_directed, "version": graph.version}
+
+
+def graph_json(graph) -> tuple:
+    """(tag, text) of the graph at its current version."""
+    entry = _cache.get(graph)
+    if entry is None or entry[0] != graph.version:
+        entry = (graph.version, f"{_TAG_PREFIX}-{next(_serials)}", dumps(graph_data(graph)))
+        _cache[graph] = entry
+    return entry[1], entry[2]
@@ -0,0 +1,149 @@
+from array import array
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class GraphSnapshot(object):
+    """
+    Immutable, read-only copy of a Graph packed for fast traversal.
+
+    Vertex ids are mapped to a dense index 0..n-1. Adjacency is stored in CSR
+    (compressed sparse row) form for both directions: the neighbours of vertex i
+    are targets[offsets[i]:offsets[i + 1]]. Offsets and targets are contiguous
+    int64 buffers which numpy can wrap without copying (see as_numpy).
+    Vertex attributes are stored column-wise, one list per attribute name.
+    """
+
+    def __init__(self, graph) -> None:
+        self.version = graph.version
+        self.is_directed = graph._is_directed
+        self.ids = list(graph._vertices.keys())
+        self.index = {vid: i for i, vid in enumerate(self.ids)}
+
+        self.out_offsets, self.out_targets, self.edge_attributes = self._pack(graph._edges)
+        self.in_offsets, self.in_targets, _ = self._pack(graph._in_edges)
+
+        self.columns = {}
+        self._typed_columns = {}
+        size = len(self.ids)
+        for i, node in enumerate(graph._vertices.values()):
+            for key, value in node._attributes.items():
+                column = self.columns.get(key)
+                if column is None:
+                    column = self.columns[key] = [None] * size
+                column[i] = value
+
+    def _pack(self, adjacency: dict) -> tuple:
+        index = self.index
+        offsets = array('q', [0])
+        targets = array('q')
+        attributes = []
+        for vid in self.ids:
+            for target, attrs in adjacency.get(vid, {}).items():
+                target_index = index.get(target)
+                if target_index is None:
+                    continue
+                targets.append(target_index)
+                attributes.append(attrs)
+            offsets.append(len(targets))
+        return offsets, targets, attributes
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, vid) -> bool:
+        return vid in self.index
+
+    def num_edges(self) -> int:
+        return len(self.out_targets)
+
+    def successor_indices(self, i: int) -> array:
+        return self.out_targets[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def predecessor_indices(self, i: int) -> array:
+        return self.in_targets[self.in_offsets[i]:self.in_offsets[i + 1]]
+
+    def successors(self, vid) -> list:
+        ids = self.ids
+        return [ids[j] for j in self.successor_indices(self.index[vid])]
+
+    def predecessors(self, vid) -> list:
+        ids = self.ids
+        return [ids[j] for j in self.predecessor_indices(self.index[vid])]
+
+    def out_degree(self, vid) -> int:
+        i = self.index[vid]
+        return self.out_offsets[i + 1] - self.out_offsets[i]
+
+    def in_degree(self, vid) -> int:
+        i = self.index[vid]
+        return self.in_offsets[i + 1] - self.in_offsets[i]
+
+    def edges(self):
+        """Yields (source_id, target_id, attrs) in CSR order."""
+        ids = self.ids
+        offsets = self.out_offsets
+        for i, source in enumerate(ids):
+            for k in range(offsets[i], offsets[i + 1]):
+                yield source, ids[self.out_targets[k]], self.edge_attributes[k]
+
+    def attributes(self, vid) -> dict:
+        i = self.index[vid]
+        return {key: column[i] for key, column in self.columns.items() if column[i] is not None}
+
+    def column(self, attr_name: str) -> list:
+        """Values of one attribute aligned with ids, None where a vertex lacks it."""
+        return self.columns.get(attr_name, [None] * len(self.ids))
+
+    def typed_column(self, attr_name: str):
+        """
+        One attribute as a numpy array with a single dtype, for vectorized filtering.
+
+        Returns (values, present, value_type): present is a boolean mask of the
+        vertices having the attribute and value_type the Python type the dtype
+        was chosen for (int, float, datetime or str). Returns None when numpy
+        is missing or the values mix incompatible types.
+        """
+        if np is None:
+            return None
+        if attr_name in self._typed_columns:
+            return self._typed_columns[attr_name]
+
+        column = self.column(attr_name)
+        types = {type(value) for value in column if value is not None}
+        if not types or types == {int}:
+            value_type, dtype, fill = int, np.int64, 0
+        elif types == {int, float} or types == {float}:
+            value_type, dtype, fill = float, np.float64, 0.0
+        elif types == {datetime} and all(value.tzinfo is None for value in column if value is not None):
+            value_type, dtype, fill = datetime, "datetime64[us]", None
+        elif types == {str}:
+            value_type, dtype, fill = str, np.str_, ""
+        else:
+            value_type = dtype = fill = None
+
+        typed = None
+        if dtype is not None:
+            try:
+                values = np.array([fill if value is None else value for value in column], dtype=dtype)
+                present = np.fromiter((value is not None for value in column), dtype=bool, count=len(column))
+                typed = (values, present, value_type)
+            except OverflowError:
+                typed = None
+        self._typed_columns[attr_name] = typed
+        return typed
+
+    def as_numpy(self) -> dict:
+        """Zero-copy numpy views of the CSR buffers. Requires numpy."""
+        if np is None:
+            raise ImportError("numpy is required for GraphSnapshot.as_numpy")
+        views = {}
+        for name in ("out_offsets", "out_targets", "in_offsets", "in_targets"):
+            view = np.frombuffer(getattr(self, name), dtype=np.int64)
+            view.flags.writeable = False
+            views[name] = view
+        return views
@@ -0,0 +1,21 @@
+import re
+
+
+class PageTemplate(object):
+    """
+    Page with NAME placeholders, read from disk and split around them once.
+
+    render fills every placeholder in a single join over the pre-split parts,
+    so a value that happens to contain a placeholder name is left alone.
+    """
+
+    def __init__(self, path: str, names) -> None:
+        with open(path) as file:
+            text = file.read()
+        #Longest first, so a name that is a prefix of another doesn't cut it
+        pattern = re.compile("(" + "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True)) + ")")
+        #Literal text at even positions, placeholder names at odd ones
+        self._parts = pattern.split(text)
+
+    def render(self, values: dict) -> str:
+        return "".join(values[part] if i % 2 else part for i, part in enumerate(self._parts))
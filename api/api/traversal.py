@@ -0,0 +1,330 @@
+"""
+Graph traversals and algorithms over the CSR form of a graph.
+
+Every function takes a Graph, a FilteredGraphView or a GraphSnapshot and works
+on the snapshot (see Graph.freeze), so repeated calls on an unchanged graph
+share one packed copy. Vertices are passed and returned as vertex ids.
+All traversals are iterative and run in O(V + E), Dijkstra in O(E log V).
+
+direction selects the edges followed from a vertex: "out" (successors),
+"in" (predecessors) or "both". An undirected graph stores each edge in both
+directions, so "out" already reaches every neighbour.
+"""
+import heapq
+
+from graph_snapshot import GraphSnapshot
+
+OUT = "out"
+IN = "in"
+BOTH = "both"
+_REVERSED = {OUT: IN, IN: OUT, BOTH: BOTH}
+
+
+def _snapshot(graph) -> GraphSnapshot:
+    return graph if isinstance(graph, GraphSnapshot) else graph.freeze()
+
+
+#CSR (offsets, targets) pairs to follow for a direction
+def _adjacency(snapshot: GraphSnapshot, direction: str) -> list:
+    if direction == OUT:
+        return [(snapshot.out_offsets, snapshot.out_targets)]
+    if direction == IN:
+        return [(snapshot.in_offsets, snapshot.in_targets)]
+    if direction == BOTH:
+        if not snapshot.is_directed:
+            return [(snapshot.out_offsets, snapshot.out_targets)]
+        return [(snapshot.out_offsets, snapshot.out_targets), (snapshot.in_offsets, snapshot.in_targets)]
+    raise ValueError(f"Unknown direction: {direction}")
+
+
+def _index(snapshot: GraphSnapshot, vid) -> int:
+    index = snapshot.index.get(vid)
+    if index is None:
+        raise KeyError(f"Vertex {vid!r} is not in the graph")
+    return index
+
+
+#Breadth-first search from source index, returns (order, parents) where parents[i] is -1
+#for the source and None for unreached vertices. depth limits the number of levels.
+def _bfs(snapshot: GraphSnapshot, source: int, direction: str, depth: int = None) -> tuple:
+    adjacency = _adjacency(snapshot, direction)
+    parents = [None] * len(snapshot)
+    parents[source] = -1
+    order = [source]
+    frontier = [source]
+    level = 0
+    while frontier and (depth is None or level < depth):
+        level += 1
+        next_frontier = []
+        for current in frontier:
+            for offsets, targets in adjacency:
+                for neighbor in targets[offsets[current]:offsets[current + 1]]:
+                    if parents[neighbor] is None:
+                        parents[neighbor] = current
+                        next_frontier.append(neighbor)
+        order.extend(next_frontier)
+        frontier = next_frontier
+    return order, parents
+
+
+def bfs(graph, source, direction: str = OUT) -> list:
+    """Ids of the vertices reachable from source, in breadth-first order."""
+    snapshot = _snapshot(graph)
+    order, _ = _bfs(snapshot, _index(snapshot, source), direction)
+    ids = snapshot.ids
+    return [ids[i] for i in order]
+
+
+def bfs_tree(graph, source, direction: str = OUT) -> dict:
+    """Breadth-first tree from source as id -> parent id, None for source; reached vertices only."""
+    snapshot = _snapshot(graph)
+    order, parents = _bfs(snapshot, _index(snapshot, source), direction)
+    ids = snapshot.ids
+    return {ids[i]: ids[parents[i]] if parents[i] != -1 else None for i in order}
+
+
+def dfs(graph, source, direction: str = OUT) -> list:
+    """Ids of the vertices reachable from source, in depth-first preorder."""
+    snapshot = _snapshot(graph)
+    adjacency = _adjacency(snapshot, direction)
+    visited = bytearray(len(snapshot))
+    ids = snapshot.ids
+    order = []
+    stack = [_index(snapshot, source)]
+    while stack:
+        current = stack.pop()
+        if visited[current]:
+            continue
+        visited[current] = 1
+        order.append(ids[current])
+        #Pushed in reverse so neighbours are visited in adjacency order
+        for offsets, targets in reversed(adjacency):
+            for neighbor in reversed(targets[offsets[current]:offsets[current + 1]]):
+                if not visited[neighbor]:
+                    stack.append(neighbor)
+    return order
+
+
+def k_hop(graph, source, k: int, direction: str = BOTH) -> list:
+    """Ids of the vertices at most k edges away from source, source excluded, nearest first."""
+    snapshot = _snapshot(graph)
+    order, _ = _bfs(snapshot, _index(snapshot, source), direction, depth=k)
+    ids = snapshot.ids
+    return [ids[i] for i in order[1:]]
+
+
+def component_labels(graph) -> list:
+    """
+    Weakly connected component number of every vertex, aligned with the snapshot ids.
+
+    Components are numbered in the order of their first vertex, so component c
+    starts at the first index labelled c.
+    """
+    snapshot = _snapshot(graph)
+    adjacency = _adjacency(snapshot, BOTH)
+    labels = [-1] * len(snapshot)
+    count = 0
+    for start in range(len(snapshot)):
+        if labels[start] != -1:
+            continue
+        labels[start] = count
+        stack = [start]
+        while stack:
+            current = stack.pop()
+            for offsets, targets in adjacency:
+                for neighbor in targets[offsets[current]:offsets[current + 1]]:
+                    if labels[neighbor] == -1:
+                        labels[neighbor] = count
+                        stack.append(neighbor)
+        count += 1
+    return labels
+
+
+def connected_components(graph) -> list:
+    """Weakly connected components as lists of ids, ordered by their first vertex, which comes first."""
+    snapshot = _snapshot(graph)
+    components = []
+    for vid, label in zip(snapshot.ids, component_labels(snapshot)):
+        if label == len(components):
+            components.append([])
+        components[label].append(vid)
+    return components
+
+
+def strongly_connected_components(graph) -> list:
+    """Strongly connected components as lists of ids (iterative Tarjan), in reverse topological order."""
+    snapshot = _snapshot(graph)
+    offsets, targets = snapshot.out_offsets, snapshot.out_targets
+    ids = snapshot.ids
+    size = len(snapshot)
+    order = [-1] * size      #discovery order
+    low = [0] * size
+    on_stack = bytearray(size)
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(size):
+        if order[root] != -1:
+            continue
+        #Each frame is (vertex, position of the next edge to look at)
+        work = [(root, offsets[root])]
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while work:
+            current, position = work[-1]
+            end = offsets[current + 1]
+            while position < end:
+                neighbor = targets[position]
+                position += 1
+                if order[neighbor] == -1:
+                    work[-1] = (current, position)
+                    order[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack[neighbor] = 1
+                    work.append((neighbor, offsets[neighbor]))
+                    break
+                if on_stack[neighbor] and order[neighbor] < low[current]:
+                    low[current] = order[neighbor]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[current] < low[parent]:
+                        low[parent] = low[current]
+                if low[current] == order[current]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(ids[member])
+                        if member == current:
+                            break
+                    components.append(component)
+    return components
+
+
+def shortest_path(graph, source, target, direction: str = OUT):
+    """
+    Ids on a path from source to target with the fewest edges, None if target is unreachable.
+
+    Searches from both ends at once, always growing the smaller frontier, so
+    only the neighbourhoods of the two vertices are visited on typical graphs.
+    """
+    snapshot = _snapshot(graph)
+    start, goal = _index(snapshot, source), _index(snapshot, target)
+    if start == goal:
+        return [source]
+
+    sides = ((_adjacency(snapshot, direction), {start: -1}, [start]),
+             (_adjacency(snapshot, _REVERSED[direction]), {goal: -1}, [goal]))
+    while sides[0][2] and sides[1][2]:
+        side = 0 if len(sides[0][2]) <= len(sides[1][2]) else 1
+        adjacency, parents, frontier = sides[side]
+        others = sides[1 - side][1]
+        next_frontier = []
+        for current in frontier:
+            for offsets, targets in adjacency:
+                for neighbor in targets[offsets[current]:offsets[current + 1]]:
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = current
+                    if neighbor in others:
+                        return _join(snapshot, sides[0][1], sides[1][1], neighbor)
+                    next_frontier.append(neighbor)
+        frontier[:] = next_frontier
+    return None
+
+
+#Path through meeting from the forward (source side) and backward (target side) parent maps
+def _join(snapshot: GraphSnapshot, forward: dict, backward: dict, meeting: int) -> list:
+    ids = snapshot.ids
+    path = []
+    current = meeting
+    while current != -1:
+        path.append(ids[current])
+        current = forward[current]
+    path.reverse()
+    current = backward[meeting]
+    while current != -1:
+        path.append(ids[current])
+        current = backward[current]
+    return path
+
+
+def _path(snapshot: GraphSnapshot, parents: list, goal: int):
+    if parents[goal] is None:
+        return None
+    path = []
+    current = goal
+    while current != -1:
+        path.append(snapshot.ids[current])
+        current = parents[current]
+    path.reverse()
+    return path
+
+
+#Edge weights come from an edge attribute; CLI values are text, so numeric strings are accepted
+def _weight(attrs: dict, weight: str, default: float) -> float:
+    value = attrs.get(weight, default)
+    if not isinstance(value, (int, float)):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = default
+    if value < 0:
+        raise ValueError(f"Negative edge weight {value} on attribute {weight!r}")
+    return value
+
+
+def _dijkstra(snapshot: GraphSnapshot, source: int, weight: str, default: float, goal: int = None) -> tuple:
+    offsets, targets, attributes = snapshot.out_offsets, snapshot.out_targets, snapshot.edge_attributes
+    distances = {source: 0}
+    parents = [None] * len(snapshot)
+    parents[source] = -1
+    done = bytearray(len(snapshot))
+    heap = [(0, source)]
+    while heap:
+        distance, current = heapq.heappop(heap)
+        if done[current]:
+            continue
+        done[current] = 1
+        if current == goal:
+            break
+        for position in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[position]
+            if done[neighbor]:
+                continue
+            candidate = distance + _weight(attributes[position], weight, default)
+            if candidate < distances.get(neighbor, float("inf")):
+                distances[neighbor] = candidate
+                parents[neighbor] = current
+                heapq.heappush(heap, (candidate, neighbor))
+    return distances, parents
+
+
+def dijkstra(graph, source, weight: str = "weight", default_weight: float = 1) -> dict:
+    """
+    Weighted distances from source along outgoing edges, as id -> distance.
+
+    The weight of an edge is its `weight` attribute, default_weight when the
+    edge has none or it isn't a number. Negative weights raise ValueError.
+    """
+    snapshot = _snapshot(graph)
+    distances, _ = _dijkstra(snapshot, _index(snapshot, source), weight, default_weight)
+    ids = snapshot.ids
+    return {ids[i]: distance for i, distance in distances.items()}
+
+
+def weighted_shortest_path(graph, source, target, weight: str = "weight", default_weight: float = 1):
+    """(distance, ids on the path) of a lightest path from source to target, None if unreachable."""
+    snapshot = _snapshot(graph)
+    goal = _index(snapshot, target)
+    distances, parents = _dijkstra(snapshot, _index(snapshot, source), weight, default_weight, goal)
+    path = _path(snapshot, parents, goal)
+    if path is None:
+        return None
+    return distances[goal], path
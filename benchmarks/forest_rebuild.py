@@ -0,0 +1,74 @@
+"""
+Times ForestView builds, and single edits followed by graph_updated, on large random graphs.
+
+Run from the repository root with the packages from requirements.txt installed:
+    python benchmarks/forest_rebuild.py --edges 100000
+"""
+import argparse
+import random
+import time
+
+from graph_api import Graph, Node
+from TreeVIew.tree_view import ForestView
+
+
+def build_graph(vertex_count: int, edge_count: int, directed: bool, seed: int) -> Graph:
+    rng = random.Random(seed)
+    g = Graph(directed)
+    for i in range(vertex_count):
+        g.add_vertex(Node(i))
+    added = 0
+    while added < edge_count:
+        a = rng.randrange(vertex_count)
+        b = rng.randrange(vertex_count)
+        if a != b and b not in g._edges.get(a, {}):
+            g.create_edge(a, b)
+            added += 1
+    return g
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vertices", type=int, default=50000)
+    parser.add_argument("--edges", type=int, default=100000)
+    parser.add_argument("--undirected", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    g = build_graph(args.vertices, args.edges, not args.undirected, args.seed)
+    rng = random.Random(args.seed)
+
+    builds = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        forest = ForestView(g)
+        builds.append(time.perf_counter() - start)
+
+    #Each edit joins or splits components, so roots come and go
+    edits = {}
+    next_id = args.vertices
+    for _ in range(args.repeat):
+        a = rng.randrange(args.vertices)
+        for edit in ("add vertex", "add edge", "delete edge", "delete vertex"):
+            start = time.perf_counter()
+            if edit == "add vertex":
+                g.add_vertex(Node(next_id))
+            elif edit == "add edge":
+                g.create_edge(next_id, a)
+            elif edit == "delete edge":
+                g.delete_edge(next_id, a)
+            else:
+                g.delete_vertex(Node(next_id))
+                next_id += 1
+            forest.graph_updated()
+            edits.setdefault(edit, []).append(time.perf_counter() - start)
+
+    print(f"vertices={args.vertices} edges={args.edges} roots={len(forest.roots)}")
+    print(f"forest build: best {min(builds) * 1000:.1f} ms, worst {max(builds) * 1000:.1f} ms")
+    for edit, timings in edits.items():
+        print(f"{edit} + graph_updated: best {min(timings) * 1000:.3f} ms, worst {max(timings) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares the memory used by Graph against the previous layout, where every
+Node had a __dict__, nothing was interned and both directions of an
+undirected edge had their own attribute dict.
+
+Run from the repository root with the packages from requirements.txt installed:
+    python benchmarks/memory_layout.py --vertices 200000
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from graph_api import Graph, Node
+
+
+class LegacyNode(object):
+    def __init__(self, id):
+        self._attributes = {'id': id}
+
+
+#Returns the graph as JSON text, so each build parses its own copy like a data source plugin would
+def generate_document(vertex_count: int, edge_count: int, seed: int) -> str:
+    rng = random.Random(seed)
+    records = [{"id": f"v{i}", "type": "member", "relationship": rng.choice(["family", "friend", "colleague"]),
+                "age": rng.randrange(18, 90)} for i in range(vertex_count)]
+    edges = [(f"v{rng.randrange(vertex_count)}", f"v{rng.randrange(vertex_count)}", {"relation": "friend"})
+             for _ in range(edge_count)]
+    return json.dumps({"records": records, "edges": edges})
+
+
+def build_legacy(document: str) -> tuple:
+    data = json.loads(document)
+    records, edges = data["records"], data["edges"]
+    vertices = {}
+    for record in records:
+        node = LegacyNode(record["id"])
+        for key, value in record.items():
+            if key != "id":
+                node._attributes[key] = value
+        vertices[record["id"]] = node
+    adjacency = {}
+    for source, target, attrs in edges:
+        adjacency.setdefault(source, {}).setdefault(target, dict(attrs))
+        adjacency.setdefault(target, {}).setdefault(source, dict(attrs))
+    return vertices, adjacency
+
+
+def build_current(document: str) -> Graph:
+    data = json.loads(document)
+    records, edges = data["records"], data["edges"]
+    g = Graph(False)
+    for record in records:
+        node = Node(record["id"])
+        for key, value in record.items():
+            if key != "id":
+                node.set_attribute(key, value)
+        g.add_vertex(node)
+    for source, target, attrs in edges:
+        g.create_edge(source, target, **attrs)
+    return g
+
+
+def measure(build, document: str) -> int:
+    tracemalloc.start()
+    result = build(document)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vertices", type=int, default=200000)
+    parser.add_argument("--edges", type=int, default=400000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    document = generate_document(args.vertices, args.edges, args.seed)
+    legacy = measure(build_legacy, document)
+    current = measure(build_current, document)
+
+    print(f"vertices={args.vertices} edges={args.edges}")
+    print(f"previous layout: {legacy / 2**20:.1f} MiB")
+    print(f"current layout:  {current / 2**20:.1f} MiB ({100 * current / legacy:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
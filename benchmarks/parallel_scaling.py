@@ -0,0 +1,83 @@
+"""
+Measures how sharded filter evaluation scales with the number of worker processes.
+
+Typed columns are built and copied to shared memory once before timing, so
+the numbers compare the mask evaluation itself: the single-process numpy
+path against ParallelFilterEvaluator with 1 to --max-workers workers.
+
+Run from the repository root with the packages from requirements.txt installed:
+    python benchmarks/parallel_scaling.py --vertices 5000000 --max-workers 8
+"""
+import argparse
+import os
+import random
+import time
+
+from graph_api import Graph
+from graph_snapshot import np
+from filters import FilterFilter
+from filter_expression import ExpressionFilter
+from parallel_filters import ParallelFilterEvaluator
+
+
+def build_graph(vertex_count: int, seed: int) -> Graph:
+    rng = random.Random(seed)
+    cities = ["Belgrade", "Novi Sad", "Nis", "Kragujevac", "Subotica"]
+    g = Graph(True)
+    g.add_vertices((i, {"age": rng.randrange(90), "city": rng.choice(cities), "score": rng.random()})
+                   for i in range(vertex_count))
+    return g
+
+
+def sequential_mask(snapshot, filters: list):
+    mask = None
+    for f in filters:
+        column_mask = f.mask(snapshot)
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    if np is None:
+        raise SystemExit("parallel_scaling.py needs numpy, install it with pip install -r requirements.txt")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vertices", type=int, default=2000000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    g = build_graph(args.vertices, args.seed)
+    snapshot = g.freeze()
+    filters = [FilterFilter("age", ">=", "30"),
+               ExpressionFilter('city == "Novi Sad" OR (city != Nis AND score > 0.75)')]
+    for name in ("age", "city", "score"):
+        snapshot.typed_column(name)
+
+    expected = sequential_mask(snapshot, filters)
+    single = best_of(args.repeat, lambda: sequential_mask(snapshot, filters))
+    print(f"vertices={args.vertices} matched={int(expected.sum())}")
+    print(f"single process: {single * 1000:.1f} ms")
+
+    for workers in range(1, args.max_workers + 1):
+        evaluator = ParallelFilterEvaluator(workers)
+        try:
+            #Starts the workers and shares the columns outside of the timed runs
+            assert (evaluator.mask(snapshot, filters) == expected).all()
+            best = best_of(args.repeat, lambda: evaluator.mask(snapshot, filters))
+        finally:
+            evaluator.close()
+        print(f"{workers} workers: {best * 1000:.1f} ms, speedup {single / best:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Times the traversal module against the equivalent networkx algorithms on one random graph.
+
+The snapshot is built once (see Graph.freeze) and its build time is reported
+separately, like the networkx graph construction.
+
+Run from the repository root with the packages from requirements.txt installed:
+    python benchmarks/traversal_vs_networkx.py --vertices 200000 --edges 600000
+"""
+import argparse
+import random
+import time
+
+import networkx as nx
+
+import traversal
+from graph_api import Graph
+
+
+def build_graphs(vertex_count: int, edge_count: int, directed: bool, seed: int) -> tuple:
+    rng = random.Random(seed)
+    edges = {}
+    while len(edges) < edge_count:
+        a, b = rng.randrange(vertex_count), rng.randrange(vertex_count)
+        if a != b and (directed or (b, a) not in edges):
+            edges[(a, b)] = rng.randint(1, 10)
+
+    g = Graph(directed)
+    g.add_vertices((i, None) for i in range(vertex_count))
+    g.create_edges((a, b, {"weight": w}) for (a, b), w in edges.items())
+
+    G = nx.DiGraph() if directed else nx.Graph()
+    G.add_nodes_from(range(vertex_count))
+    G.add_weighted_edges_from((a, b, w) for (a, b), w in edges.items())
+    return g, G
+
+
+def timed(func) -> tuple:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vertices", type=int, default=100000)
+    parser.add_argument("--edges", type=int, default=300000)
+    parser.add_argument("--undirected", action="store_true")
+    parser.add_argument("--hops", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    directed = not args.undirected
+    g, G = build_graphs(args.vertices, args.edges, directed, args.seed)
+    source, target = 0, args.vertices - 1
+    undirected = G.to_undirected(as_view=True) if directed else G
+    weak_components = nx.weakly_connected_components if directed else nx.connected_components
+
+    freeze_time, snapshot = timed(g.freeze)
+    print(f"vertices={args.vertices} edges={args.edges} directed={directed}")
+    print(f"snapshot build: {freeze_time * 1000:.1f} ms")
+
+    cases = [
+        ("bfs", lambda: traversal.bfs(snapshot, source),
+                lambda: [source] + [v for _, v in nx.bfs_edges(G, source)]),
+        ("dfs", lambda: traversal.dfs(snapshot, source),
+                lambda: list(nx.dfs_preorder_nodes(G, source))),
+        ("connected components", lambda: traversal.connected_components(snapshot),
+                                 lambda: list(weak_components(G))),
+        ("shortest path", lambda: traversal.shortest_path(snapshot, source, target),
+                          lambda: nx.shortest_path(G, source, target)),
+        ("dijkstra", lambda: traversal.dijkstra(snapshot, source),
+                     lambda: nx.single_source_dijkstra_path_length(G, source)),
+        (f"{args.hops}-hop", lambda: traversal.k_hop(snapshot, source, args.hops),
+                             lambda: nx.single_source_shortest_path_length(undirected, source, cutoff=args.hops)),
+    ]
+    if directed:
+        cases.append(("strongly connected components", lambda: traversal.strongly_connected_components(snapshot),
+                      lambda: list(nx.strongly_connected_components(G))))
+
+    print(f"{'algorithm':32}{'traversal':>12}{'networkx':>12}")
+    for name, ours, theirs in cases:
+        our_time, _ = timed(ours)
+        their_time, _ = timed(theirs)
+        print(f"{name:32}{our_time * 1000:10.1f}ms{their_time * 1000:10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
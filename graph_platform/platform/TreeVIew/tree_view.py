@@ -1,19 +1,70 @@
 import itertools
 import json
-from graph_api import Graph, Node
+from bisect import bisect_left
+from collections import deque
+from operator import attrgetter
+from graph_api import Graph, Node, VERTEX_ADDED, VERTEX_EDITED, VERTEX_REMOVED, EDGE_REMOVED
+from components import ComponentIndex
+
+class TreeRegistry:
+    """Every TreeNode of a forest, by tree_id and by the id of the vertex it shows."""
+
+    def __init__(self):
+        self._by_tree_id = {}
+        #vertex id -> set of TreeNodes showing it, a vertex shows up once under each of its neighbours
+        self._by_vertex = {}
+
+    def add(self, tree_node):
+        self._by_tree_id[tree_node.tree_id] = tree_node
+        self._by_vertex.setdefault(tree_node.node.get_id(), set()).add(tree_node)
+
+    def discard(self, tree_node):
+        if self._by_tree_id.pop(tree_node.tree_id, None) is None:
+            return
+        node_id = tree_node.node.get_id()
+        tree_nodes = self._by_vertex[node_id]
+        tree_nodes.discard(tree_node)
+        if not tree_nodes:
+            del self._by_vertex[node_id]
+
+    def get(self, tree_id):
+        return self._by_tree_id.get(tree_id)
+
+    def showing(self, node_id) -> list:
+        return list(self._by_vertex.get(node_id, ()))
+
+    def __contains__(self, tree_node) -> bool:
+        return self._by_tree_id.get(tree_node.tree_id) is tree_node
+
+    def __len__(self) -> int:
+        return len(self._by_tree_id)
+
 
 class TreeNode:
     _id_counter = itertools.count(1)
 
-    def __init__(self, node, graph, parent=None):
+    def __init__(self, node, graph, parent=None, registry=None):
         self.node = node
         self.graph = graph
         self._children = None
         self.expanded = False
         self.tree_id = f"T{next(TreeNode._id_counter)}"
         self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        #Bumped whenever the row of the node changes: expansion or the vertex behind it
+        self.stamp = 0
+        #TreeRegistry shared by the whole forest, children are added as they are created
+        self._registry = registry
+        if registry is not None:
+            registry.add(self)
 
     def expand(self):
+        self._load_children()
+        if not self.expanded:
+            self.expanded = True
+            self.stamp += 1
+
+    def _load_children(self):
         if self._children is None:
             self._children = []
             outgoing, incoming = self.graph.get_connected_nodes(self.node.get_id())
@@ -21,12 +72,30 @@ class TreeNode:
             neighbors.update(outgoing)
             neighbors.update(incoming)
             for child_node in neighbors:
-                child_tree_node = TreeNode(child_node, self.graph, parent=self)
+                child_tree_node = TreeNode(child_node, self.graph, parent=self, registry=self._registry)
                 self._children.append(child_tree_node)
-        self.expanded = True
+
+    #Drops the loaded children, removing the whole subtree from the registry
+    def unload_children(self):
+        if self._registry is not None and self._children:
+            stack = list(self._children)
+            while stack:
+                tree_node = stack.pop()
+                self._registry.discard(tree_node)
+                if tree_node._children:
+                    stack.extend(tree_node._children)
+        self._children = None
+
+    #Removes this node and its subtree from the registry
+    def unregister(self):
+        self.unload_children()
+        if self._registry is not None:
+            self._registry.discard(self)
 
     def collapse(self):
-        self.expanded = False
+        if self.expanded:
+            self.expanded = False
+            self.stamp += 1
 
     def is_expandable(self):
         outgoing, incoming = self.graph.get_connected_nodes(self.node.get_id())
@@ -44,71 +113,337 @@ def print_tree(node: TreeNode, prefix=""):
             print_tree(child, prefix + "    ")
 
 
+#Row of the windowed tree view, without the attributes of the vertex
+def _row(tree_node: TreeNode) -> dict:
+    node = tree_node.node
+    return {
+        "tree_id": tree_node.tree_id,
+        "node_id": node.get_id(),
+        "label": _label(node),
+        "depth": tree_node.depth,
+        "has_children": bool(tree_node._children) if tree_node._children is not None else tree_node.is_expandable(),
+        "is_expanded": tree_node.expanded,
+    }
+
+
+#Visible rows of a tree in display order: the root, and the children of expanded nodes under it
+def _tree_rows(root: TreeNode) -> list:
+    rows = []
+    stack = [root]
+    while stack:
+        tree_node = stack.pop()
+        rows.append(tree_node)
+        if tree_node.expanded:
+            stack.extend(reversed(tree_node.get_children()))
+    return rows
+
+
+_DIFF_CHUNK = 256
+
+
+#Offsets below count where a[a_start:] and b[b_start:] differ. Equal chunks are skipped with one list comparison,
+#which compares the items by identity first.
+def _mismatches(a: list, b: list, a_start: int, b_start: int, count: int):
+    for chunk in range(0, count, _DIFF_CHUNK):
+        end = min(chunk + _DIFF_CHUNK, count)
+        if a[a_start + chunk:a_start + end] == b[b_start + chunk:b_start + end]:
+            continue
+        for i in range(chunk, end):
+            if a[a_start + i] != b[b_start + i]:
+                yield i
+
+
+_stamp = attrgetter("stamp")
+
+
+#JSON-patch-style ops turning the old rows (TreeNodes) into the new ones. The rows between the common
+#prefix and suffix are removed and inserted, the rows around them whose stamp changed are updated.
+#Returns None instead of ops that would carry more than limit rows.
+def _diff_rows(old_nodes: list, old_stamps: list, nodes: list, stamps: list, limit: int):
+    common = min(len(old_nodes), len(nodes))
+    start = next(_mismatches(old_nodes, nodes, 0, 0, common), common)
+    suffix = next(_mismatches(old_nodes[::-1], nodes[::-1], 0, 0, common - start), common - start)
+    old_end, new_end = len(old_nodes) - suffix, len(nodes) - suffix
+    if new_end - start > limit:
+        return None
+
+    ops = []
+    if old_end > start:
+        ops.append({"op": "remove", "index": start, "count": old_end - start})
+    if new_end > start:
+        ops.append({"op": "insert", "index": start, "rows": [_row(tree_node) for tree_node in nodes[start:new_end]]})
+    for old_start, new_start, count in ((0, 0, start), (old_end, new_end, suffix)):
+        for i in _mismatches(old_stamps, stamps, old_start, new_start, count):
+            if len(ops) > limit:
+                return None
+            ops.append({"op": "update", "index": new_start + i, "row": _row(nodes[new_start + i])})
+    return ops
+
+
+#Number of rows a delta sends
+def _delta_size(ops: list) -> int:
+    return sum(len(op["rows"]) if "rows" in op else "row" in op for op in ops)
+
+
+#Attributes shown as a row's label before falling back to the vertex id
+LABEL_ATTRIBUTES = ("label", "name", "title")
+
+
+def _label(node: Node) -> str:
+    attributes = node.get_attributes()
+    for attr_name in LABEL_ATTRIBUTES:
+        value = attributes.get(attr_name)
+        if value is not None:
+            return str(value)
+    return str(node.get_id())
+
+
+#Number of published revisions kept so clients can catch up with deltas
+TREE_HISTORY = 64
+#Deltas carrying more rows than this are replaced by a snapshot, after which the client fetches one window
+SNAPSHOT_ROWS = 100
+
+
 class ForestView:
+    #Revisions are unique across forests, a client of a replaced forest always gets a snapshot
+    _revisions = itertools.count(1)
+
     def __init__(self, graph):
         self.graph = graph
+        #Root TreeNodes in the order their vertices were added, and their (order, vertex id) keys
         self.roots = []
+        self._root_keys = []
+        #vertex id -> root TreeNode of its tree
+        self._roots_by_id = {}
+        #Every TreeNode currently in the forest
+        self._tree_nodes = TreeRegistry()
+        #Connected components of graph, and the graph version the forest reflects
+        self._components = None
+        self._version = None
         #Array of arrays, each array contains the id's of nodes that were expanded, so we know what line of nodes to expand on refresh
         self._expanded_paths = set()
+        self.selected_id = None
+        #TreeNodes from the root down to the selected node
+        self._selected_path = None
+        #Published state: its revision, the deltas that led to it and its selection
+        self.revision = next(ForestView._revisions)
+        self._history = deque(maxlen=TREE_HISTORY)     #(previous revision, revision, ops)
+        self._published_selection = None
+        #Published rows: one per root, followed by the rows under it for expanded roots.
+        #root key -> (rows, stamps) of every expanded root, as published
+        self._published_trees = {}
+        #Roots whose rows may differ from the published ones
+        self._dirty_roots = set()
+        #Row ops since the last revision, None when they became too many for a delta
+        self._pending_ops = []
         self._build_forest()
+        self._pending_ops = []
 
     def _restore_expansions(self):
         unbroken_paths = self._expanded_paths.copy()
 
         for path_ids in self._expanded_paths:
-            current_nodes = self.roots
-            for node_id in path_ids:
-                # Find a node with this ID in current level
-                match = next((n for n in current_nodes if n.node.get_id() == node_id), None)
+            match = self._roots_by_id.get(path_ids[0])
+            for depth, node_id in enumerate(path_ids):
+                if depth:
+                    # Find a node with this ID in current level
+                    match = next((n for n in match.get_children() if n.node.get_id() == node_id), None)
                 if not match:
                     unbroken_paths.remove(path_ids)
                     break  # Path broken, stop here
-                match.expand()  # Ensure it's expanded before going deeper
-                current_nodes = match.get_children()
+                if not match.expanded:
+                    match.expand()  # Ensure it's expanded before going deeper
+                    self._touch(match)
 
         self._expanded_paths = unbroken_paths.copy()
 
+    #Builds every tree again, clients get a snapshot
     def _build_forest(self):
-        self.roots = []
-        visited = set()
-
-        for node_id, node in self.graph._vertices.items():
-            if node_id in visited:
+        components = self._components = ComponentIndex(self.graph)
+        self._version = self.graph.version
+        vertices = self.graph._vertices
+        self._tree_nodes = TreeRegistry()
+        self._root_keys = [(components.order(node_id), node_id) for node_id in components.roots()]
+        self.roots = [TreeNode(vertices[node_id], self.graph, registry=self._tree_nodes) for _, node_id in self._root_keys]
+        self._roots_by_id = {root.node.get_id(): root for root in self.roots}
+        self._published_trees = {}
+        self._dirty_roots = set()
+        self._restore_expansions()
+        self._pending_ops = None
+        self._flush_rows()
+
+    # The first node of every connected component is the root of its tree.
+    # Only the roots of components that merged, split or lost their first vertex are replaced.
+    def _update_roots(self):
+        removed, added = self._components.root_changes()
+        keys = self._root_keys
+        for key in removed:
+            index = bisect_left(keys, key)
+            if index == len(keys) or keys[index] != key:
                 continue
+            published = self._published_trees.pop(key, None)
+            self._emit({"op": "remove", "index": self._root_row(key), "count": len(published[0]) if published else 1})
+            del keys[index]
+            root = self.roots.pop(index)
+            del self._roots_by_id[key[1]]
+            self._dirty_roots.discard(root)
+            root.unregister()
+        vertices = self.graph._vertices
+        for key in added:
+            root = TreeNode(vertices[key[1]], self.graph, registry=self._tree_nodes)
+            index = bisect_left(self._root_keys, key)
+            self._root_keys.insert(index, key)
+            self.roots.insert(index, root)
+            self._roots_by_id[key[1]] = root
+            self._emit({"op": "insert", "index": self._root_row(key), "rows": [_row(root)]})
+
+    def _root_key(self, root: TreeNode) -> tuple:
+        node_id = root.node.get_id()
+        return self._components.order(node_id), node_id
+
+    #Published row of the root with key, or of the place a root with key is inserted at
+    def _root_row(self, key: tuple) -> int:
+        row = bisect_left(self._root_keys, key)
+        for tree_key, (rows, _) in self._published_trees.items():
+            if tree_key < key:
+                row += len(rows) - 1
+        return row
+
+    #Marks the tree of tree_node for a row diff on the next publish, unless it is hidden under a collapsed node
+    def _touch(self, tree_node: TreeNode):
+        while tree_node.parent is not None:
+            tree_node = tree_node.parent
+            if not tree_node.expanded:
+                return
+        self._dirty_roots.add(tree_node)
+
+    def _emit(self, op: dict):
+        ops = self._pending_ops
+        if ops is None:
+            return
+        ops.append(op)
+        if len(ops) > SNAPSHOT_ROWS or _delta_size(ops) > SNAPSHOT_ROWS:
+            self._pending_ops = None
+
+    #Diffs the rows of every touched tree against the published ones, each inside the rows of its root
+    def _flush_rows(self):
+        for root in self._dirty_roots:
+            key = self._root_key(root)
+            old_rows, old_stamps = self._published_trees.get(key) or ([root], [None])
+            rows = _tree_rows(root) if root.expanded else [root]
+            stamps = list(map(_stamp, rows))
+            if self._pending_ops is not None:
+                ops = _diff_rows(old_rows, old_stamps, rows, stamps, SNAPSHOT_ROWS)
+                if ops is None:
+                    self._pending_ops = None
+                else:
+                    offset = self._root_row(key)
+                    for op in ops:
+                        op["index"] += offset
+                        self._emit(op)
+            if root.expanded:
+                self._published_trees[key] = (rows, stamps)
+            else:
+                self._published_trees.pop(key, None)
+        self._dirty_roots = set()
+
+    #Graph (or the graph under a filtered view) whose change log describes our graph
+    def _source(self):
+        return getattr(self.graph, "graph", self.graph)
+
+    def set_graph(self, graph):
+        """Switches to another graph or view, keeping the expanded paths."""
+        self.graph = graph
+        self._build_forest()
+        self._publish()
 
-            # Pick this node as root of a new tree
-            root_node = TreeNode(node, self.graph)
-            self.roots.append(root_node)
-
-            # Mark all nodes in this connected component as visited
-            to_visit = [node_id]
-            while to_visit:
-                current_id = to_visit.pop()
-                if current_id in visited:
+    def graph_updated(self):
+        changes = self._source().changes_since(self._version)
+        if changes is None:
+            self._build_forest()
+        elif changes:
+            self._apply_changes(changes)
+        else:
+            self._restore_expansions()
+        self._publish()
+
+    def select(self, node_id):
+        """
+        Selects node_id, or clears the selection for None, and expands the tree down to it.
+        The expansion and the selection are published together as one revision.
+        Returns the node ids from the root of its tree down to node_id.
+        """
+        self._selected_path = self.expand_path_to_node(node_id) if node_id is not None else None
+        self.selected_id = node_id
+        self._publish()
+        return [tree_node.node.get_id() for tree_node in self._selected_path] if self._selected_path else None
+
+    #Brings the components and the loaded tree nodes up to date with the changes since the last update.
+    #Changes are interpreted against the current state of graph, which is all a filtered view keeps.
+    def _apply_changes(self, changes):
+        components = self._components
+        vertices = self.graph._vertices
+        source = self._source()
+        touched = set()
+
+        for change in changes:
+            vid = change.vertex_id
+            touched.add(vid)
+            if change.type == VERTEX_ADDED or change.type == VERTEX_EDITED or change.type == VERTEX_REMOVED:
+                if vid in vertices and vid not in components:
+                    components.add_vertex(vid)
+                elif vid not in vertices and vid in components:
+                    components.remove_vertex(vid)
+                else:
                     continue
-                visited.add(current_id)
-                outgoing, incoming = self.graph.get_connected_nodes(current_id)
-                neighbors = outgoing + incoming
-                for neighbor in neighbors:
-                    if neighbor.get_id() not in visited:
-                        to_visit.append(neighbor.get_id())
-        
+                # The vertex entered or left the view, its neighbours gain or lose a child
+                touched.update(source._edges.get(vid, ()))
+                touched.update(source._in_edges.get(vid, ()))
+            else:
+                target = change.target_id
+                touched.add(target)
+                if change.type != EDGE_REMOVED and target in self.graph._edges.get(vid, {}):
+                    components.add_edge(vid, target)
+                else:
+                    components.remove_edge(vid, target)
+
+        self._refresh_tree_nodes(touched)
+        self._update_roots()
         self._restore_expansions()
-
-    def graph_updated(self):
-        self._build_forest()
+        self._version = self.graph.version
+
+    #Reloads the children of the tree nodes showing a vertex that was touched by a change
+    def _refresh_tree_nodes(self, touched: set):
+        vertices = self.graph._vertices
+        registry = self._tree_nodes
+        for node_id in touched:
+            node = vertices.get(node_id)
+            if node is None:
+                continue
+            for tree_node in registry.showing(node_id):
+                if tree_node not in registry:
+                    #Dropped with the children of a tree node reloaded before it
+                    continue
+                tree_node.node = node
+                tree_node.stamp += 1
+                if tree_node._children is not None:
+                    tree_node.unload_children()
+                    tree_node._load_children()
+                self._touch(tree_node)
 
     def print_forest(self):
         for root in self.roots:
             print_tree(root)
 
     def expand_node_by_tree_id(self, tree_id: str) -> bool:
-        node = self._find_tree_node_by_id(tree_id, self.roots)
+        node = self._find_tree_node_by_id(tree_id)
         if node:
             node.expand()
+            self._touch(node)
             path = self._find_tree_node_path(tree_id)
             id_path = list(map(lambda tree_node: tree_node.node.get_id(), path))
             self._expanded_paths.add(tuple(id_path))
+            self._publish()
             return True
         return False
     
@@ -128,37 +463,136 @@ class ForestView:
                     self._expanded_paths.remove(p)
 
     def collapse_node_by_tree_id(self, tree_id: str) -> bool:
-        node = self._find_tree_node_by_id(tree_id, self.roots)
+        node = self._find_tree_node_by_id(tree_id)
         if node:
             node.collapse()
+            self._touch(node)
             self._delete_expanded_path(tree_id)
+            self._publish()
             return True
         return False
 
-    def _find_tree_node_by_id(self, tree_id: str, nodes: list):
-        for tree_node in nodes:
-            if tree_node.tree_id == tree_id:
-                return tree_node
-            if tree_node._children:
-                found = self._find_tree_node_by_id(tree_id, tree_node._children)
-                if found:
-                    return found
-        return None
-    
-    def _find_tree_node_path(self, tree_id: str):
-        stack = [(root, [root]) for root in self.roots]
-
-        while stack:
-            current, path = stack.pop()
-            if current.tree_id == tree_id:
-                return path
-
-            if current._children:
-                for child in current._children:
-                    stack.append((child, path + [child]))
+    def _find_tree_node_by_id(self, tree_id: str):
+        return self._tree_nodes.get(tree_id)
 
-        return None
+    #Tree nodes from the root down to tree_id, following parent pointers
+    def _find_tree_node_path(self, tree_id: str):
+        current = self._tree_nodes.get(tree_id)
+        if current is None:
+            return None
+        path = []
+        while current is not None:
+            path.append(current)
+            current = current.parent
+        path.reverse()
+        return path
     
+    #Published rows from start to stop. Runs of collapsed roots are sliced at once, only expanded trees add rows between them.
+    def _row_window(self, start: int, stop: int) -> list:
+        roots = self.roots
+        window = []
+        row = 0
+        position = 0
+        for key in sorted(self._published_trees):
+            if row >= stop:
+                break
+            index = bisect_left(self._root_keys, key)
+            end = row + index - position
+            if end > start:
+                window.extend(roots[position + max(start - row, 0):position + min(stop, end) - row])
+            row = end
+            if row >= stop:
+                break
+            rows = self._published_trees[key][0]
+            end = row + len(rows)
+            if end > start:
+                window.extend(rows[max(start - row, 0):min(stop, end) - row])
+            row = end
+            position = index + 1
+        if row < stop:
+            window.extend(roots[position + max(start - row, 0):position + stop - row])
+        return window
+
+    #Visible rows in display order: every root, and the children of expanded nodes under them
+    def _visible_rows(self) -> list:
+        return self._row_window(0, self.row_count())
+
+    def row_count(self) -> int:
+        return len(self.roots) + sum(len(rows) - 1 for rows, _ in self._published_trees.values())
+
+    def get_rows(self, offset: int = 0, limit: int = 100) -> list:
+        """
+        A window of the visible rows, without attributes.
+        Each row has tree_id, node_id, label, depth, has_children and is_expanded.
+        """
+        return [_row(tree_node) for tree_node in self._row_window(offset, offset + limit)]
+
+    #Records a new revision if the visible rows or the selection changed since the last one
+    def _publish(self):
+        self._flush_rows()
+        ops = self._pending_ops
+        self._pending_ops = []
+        #Set when the rows changed too much for a delta
+        snapshot = ops is None
+        if snapshot:
+            ops = []
+        if self.selected_id != self._published_selection:
+            self._published_selection = self.selected_id
+            ops.append(self._select_op())
+        if not ops and not snapshot:
+            return
+        previous, self.revision = self.revision, next(ForestView._revisions)
+        if snapshot or _delta_size(ops) > SNAPSHOT_ROWS:
+            ops = None
+        self._history.append((previous, self.revision, ops))
+
+    #Published row of a tree node, None when it isn't shown
+    def _row_index(self, tree_node: TreeNode):
+        if tree_node not in self._tree_nodes:
+            return None
+        root = tree_node
+        while root.parent is not None:
+            root = root.parent
+            if not root.expanded:
+                return None
+        if self._roots_by_id.get(root.node.get_id()) is not root:
+            return None
+        key = self._root_key(root)
+        row = self._root_row(key)
+        if tree_node is root:
+            return row
+        return row + self._published_trees[key][0].index(tree_node)
+
+    #The selection with the node ids on the way to it and the index of its row, so clients can scroll to it
+    def _select_op(self) -> dict:
+        path = self._selected_path
+        return {
+            "op": "select",
+            "selected_id": self.selected_id,
+            "path": [tree_node.node.get_id() for tree_node in path] if path else None,
+            "index": self._row_index(path[-1]) if path else None,
+        }
+
+    def changes_since(self, revision: int) -> tuple:
+        """
+        (current revision, ops that take a client from revision to it, in order). The ops are None
+        when the client needs a snapshot: the revision is too old or the ops would carry too many rows.
+        """
+        history = list(self._history)
+        current = history[-1][1] if history else self.revision
+        if revision == current:
+            return current, []
+        ops = None
+        for previous, _, entry_ops in history:
+            if ops is None and previous != revision:
+                continue
+            if entry_ops is None:
+                return current, None
+            ops = (ops or []) + entry_ops
+        if ops is None or _delta_size(ops) > SNAPSHOT_ROWS:
+            return current, None
+        return current, ops
+
     def convert_to_json(self):
         roots = []
 
@@ -178,36 +612,38 @@ class ForestView:
 
         return roots
     
-    def expand_path_to_node(self, node_id: str) -> bool:
+    #Expands the tree nodes above node_id and returns the tree nodes from the root down to it, None if it isn't in the forest
+    def expand_path_to_node(self, node_id: str):
         path = self._find_tree_node_path_by_node_id(node_id)
         if not path:
-            return False
+            return None
 
         id_path = list(map(lambda tree_node: tree_node.node.get_id(), path))
 
         for i in range(1, len(id_path)):
             self._expanded_paths.add(tuple(id_path[:i]))
+            if not path[i - 1].expanded:
+                path[i - 1].expand()
+                self._touch(path[i - 1])
 
-        return True
+        return path
 
+    #Returns the tree nodes on a shortest path from the root of node_id's tree to it,
+    #following the breadth-first tree the component index keeps for the component
     def _find_tree_node_path_by_node_id(self, node_id: str):
-        stack = [(root, [root]) for root in self.roots]
-
-        visited = set()
-
-        while stack:
-            current, path = stack.pop()
-            if current.node.get_id() in visited:
-                continue
-            visited.add(current.node.get_id())
-
-            if current.node.get_id() == node_id:
-                return path
-
-            if current._children is None:
-                current.expand()
-
-            for child in current.get_children():
-                stack.append((child, path + [child]))
-
-        return None
+        if node_id not in self._components:
+            return None
+        id_path = self._components.path(node_id)
+        root = self._roots_by_id.get(id_path[0])
+        if root is None:
+            return None
+
+        path = [root]
+        for next_id in id_path[1:]:
+            current = path[-1]
+            current._load_children()
+            child = next((c for c in current.get_children() if c.node.get_id() == next_id), None)
+            if child is None:
+                return None
+            path.append(child)
+        return path
@@ -0,0 +1,69 @@
+import itertools
+import json
+import weakref
+from collections import OrderedDict
+
+#Default budget for cached filter results, in vertices summed over all entries
+FILTER_CACHE_VERTICES = 2000000
+
+
+class FilterCache(object):
+    """
+    LRU cache of filter chain results.
+
+    An entry maps a prefix of a filter chain, evaluated on one version of a
+    graph, to the id -> Node dict it produced. Keys use Filter.serialize(), so
+    an equal filter added again hits the cache. Graphs are told apart by a
+    token that is never reused, unlike id(). The cache keeps its own copies of
+    the dicts, so callers are free to change what they store and get back.
+    Entries are counted against the budget by their number of vertices.
+    """
+
+    def __init__(self, max_vertices: int = FILTER_CACHE_VERTICES) -> None:
+        self.max_vertices = max_vertices
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   #key -> vertices
+        self._size = 0
+        self._tokens = weakref.WeakKeyDictionary()  #graph -> token
+        self._next_token = itertools.count()
+
+    def _key(self, graph, filters, count: int) -> tuple:
+        token = self._tokens.get(graph)
+        if token is None:
+            token = self._tokens[graph] = next(self._next_token)
+        chain = tuple((type(f).__name__, json.dumps(f.serialize(), sort_keys=True, default=str))
+                      for f in filters[:count])
+        return (token, graph.version, chain)
+
+    def lookup(self, graph, filters) -> tuple:
+        """Returns (n, vertices) for the longest cached prefix of filters, (0, None) if there is none."""
+        for count in range(len(filters), 0, -1):
+            key = self._key(graph, filters, count)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return count, dict(entry)
+        self.misses += 1
+        return 0, None
+
+    def store(self, graph, filters, count: int, vertices: dict) -> None:
+        if len(vertices) > self.max_vertices:
+            return
+        key = self._key(graph, filters, count)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = dict(vertices)
+        self._size += len(vertices)
+        while self._size > self.max_vertices:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "vertices": self._size}
@@ -0,0 +1,360 @@
+import re
+
+from filters import Filter, FilterFilter, select_mask, COLUMNAR_MIN_VERTICES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#Estimated fraction of vertices passing a comparison on an attribute without an index
+_SELECTIVITY = {"==": 0.1, "!=": 0.9, "<": 0.3, "<=": 0.3, ">": 0.3, ">=": 0.3}
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<paren>[()])
+  | (?P<op>>=|<=|==|!=|>|<)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<word>[^\s()<>=!"']+)
+)""", re.VERBOSE)
+
+_KEYWORDS = ("and", "or", "not")
+
+
+class FilterExpressionError(ValueError):
+    pass
+
+
+def tokenize(text: str) -> list:
+    """Splits an expression into (kind, value) tuples, kind is one of paren, op, keyword, value."""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise FilterExpressionError(f"Unexpected character at position {pos}: {text[pos:pos + 10]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            tokens.append(("value", re.sub(r"\\(.)", r"\1", value[1:-1])))
+        elif kind == "word":
+            if value.lower() in _KEYWORDS:
+                tokens.append(("keyword", value.lower()))
+            else:
+                tokens.append(("value", value))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+class _Comparison(object):
+    def __init__(self, attribute: str, op: str, value: str) -> None:
+        self.filter = FilterFilter(attribute, op, value)
+        self.cost = 1
+
+    def predicate(self, graph=None):
+        return self.filter.matches
+
+    def selectivity(self, graph) -> float:
+        if graph is not None and len(graph._vertices) and self.filter.type != "!=":
+            index = graph.get_index(self.filter.attribute)
+            if index is not None:
+                return self.filter.index_count(index) / len(graph._vertices)
+        return _SELECTIVITY[self.filter.type]
+
+    def plan(self, graph) -> tuple:
+        if self.filter.type != "!=":
+            index = graph.get_index(self.filter.attribute)
+            if index is not None:
+                return set(self.filter.index_ids(index)), None
+        return None, self.filter.matches
+
+    def mask(self, snapshot):
+        return self.filter.mask(snapshot)
+
+    def uses_index(self, graph) -> bool:
+        return self.filter.uses_index(graph)
+
+    def indexable_attributes(self) -> list:
+        return [self.filter.attribute] if self.filter.type != "!=" else []
+
+    def attributes(self) -> list:
+        return [self.filter.attribute]
+
+
+class _And(object):
+    def __init__(self, children: list) -> None:
+        self.children = children
+        self.cost = sum(child.cost for child in children)
+
+    #Cheap tests that reject the most vertices go first (rank = cost / (1 - selectivity))
+    def _ordered(self, graph) -> list:
+        return sorted(self.children,
+                      key=lambda child: child.cost / max(1.0 - child.selectivity(graph), 1e-9))
+
+    def predicate(self, graph=None):
+        return _all_of([child.predicate(graph) for child in self._ordered(graph)])
+
+    def selectivity(self, graph) -> float:
+        result = 1.0
+        for child in self.children:
+            result *= child.selectivity(graph)
+        return result
+
+    #The most selective indexed conjunct drives the plan, other indexed conjuncts that are
+    #estimated to be smaller than the candidates are intersected and the rest is verified
+    def plan(self, graph) -> tuple:
+        total = len(graph._vertices)
+        ids = None
+        residual = []
+        for child in self._ordered(graph):
+            if child.uses_index(graph) and (ids is None or child.selectivity(graph) * total <= len(ids)):
+                child_ids, child_residual = child.plan(graph)
+                if child_ids is not None:
+                    ids = child_ids if ids is None else ids & child_ids
+                    if child_residual is not None:
+                        residual.append(child_residual)
+                    continue
+            residual.append(child.predicate(graph))
+        if ids is None:
+            return None, _all_of(residual)
+        return ids, _all_of(residual) if residual else None
+
+    def mask(self, snapshot):
+        return _combine_masks(self.children, snapshot, lambda a, b: a & b)
+
+    def indexable_attributes(self) -> list:
+        return [attribute for child in self.children for attribute in child.indexable_attributes()]
+
+    def attributes(self) -> list:
+        return [attribute for child in self.children for attribute in child.attributes()]
+
+    def uses_index(self, graph) -> bool:
+        return any(child.uses_index(graph) for child in self.children)
+
+
+class _Or(object):
+    def __init__(self, children: list) -> None:
+        self.children = children
+        self.cost = sum(child.cost for child in children)
+
+    #Cheap tests that accept the most vertices go first (rank = cost / selectivity)
+    def _ordered(self, graph) -> list:
+        return sorted(self.children, key=lambda child: child.cost / max(child.selectivity(graph), 1e-9))
+
+    def predicate(self, graph=None):
+        return _any_of([child.predicate(graph) for child in self._ordered(graph)])
+
+    def selectivity(self, graph) -> float:
+        rejected = 1.0
+        for child in self.children:
+            rejected *= 1.0 - child.selectivity(graph)
+        return 1.0 - rejected
+
+    #Only usable through indexes when every disjunct is, the union is then verified if needed
+    def plan(self, graph) -> tuple:
+        if not all(child.uses_index(graph) for child in self.children):
+            return None, self.predicate(graph)
+        ids = set()
+        exact = True
+        for child in self.children:
+            child_ids, child_residual = child.plan(graph)
+            if child_ids is None:
+                return None, self.predicate(graph)
+            ids |= child_ids
+            exact = exact and child_residual is None
+        return ids, None if exact else self.predicate(graph)
+
+    def mask(self, snapshot):
+        return _combine_masks(self.children, snapshot, lambda a, b: a | b)
+
+    def indexable_attributes(self) -> list:
+        return [attribute for child in self.children for attribute in child.indexable_attributes()]
+
+    def attributes(self) -> list:
+        return [attribute for child in self.children for attribute in child.attributes()]
+
+    def uses_index(self, graph) -> bool:
+        return all(child.uses_index(graph) for child in self.children)
+
+
+class _Not(object):
+    def __init__(self, child) -> None:
+        self.child = child
+        self.cost = child.cost
+
+    def predicate(self, graph=None):
+        test = self.child.predicate(graph)
+        return lambda node: not test(node)
+
+    def selectivity(self, graph) -> float:
+        return 1.0 - self.child.selectivity(graph)
+
+    def plan(self, graph) -> tuple:
+        return None, self.predicate(graph)
+
+    def mask(self, snapshot):
+        mask = self.child.mask(snapshot)
+        return None if mask is None else ~mask
+
+    def uses_index(self, graph) -> bool:
+        return False
+
+    def indexable_attributes(self) -> list:
+        return []
+
+    def attributes(self) -> list:
+        return self.child.attributes()
+
+
+def _all_of(tests: list):
+    if len(tests) == 1:
+        return tests[0]
+    if len(tests) == 2:
+        first, second = tests
+        return lambda node: first(node) and second(node)
+    return lambda node: all(test(node) for test in tests)
+
+
+def _any_of(tests: list):
+    if len(tests) == 1:
+        return tests[0]
+    if len(tests) == 2:
+        first, second = tests
+        return lambda node: first(node) or second(node)
+    return lambda node: any(test(node) for test in tests)
+
+
+def _combine_masks(children: list, snapshot, combine):
+    result = None
+    for child in children:
+        mask = child.mask(snapshot)
+        if mask is None:
+            return None
+        result = mask if result is None else combine(result, mask)
+    return result
+
+
+class _Parser(object):
+    """
+    Recursive descent parser for:
+        expression := term (OR term)*
+        term       := factor (AND factor)*
+        factor     := NOT factor | '(' expression ')' | attribute op value
+    """
+
+    def __init__(self, text: str) -> None:
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterExpressionError("Empty filter expression")
+        node = self._expression()
+        if self.pos < len(self.tokens):
+            raise FilterExpressionError(f"Unexpected {self.tokens[self.pos][1]!r}")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, kind: str, value=None) -> str:
+        token_kind, token_value = self._peek()
+        if token_kind != kind or (value is not None and token_value != value):
+            found = repr(token_value) if token_kind else "end of expression"
+            raise FilterExpressionError(f"Expected {value or kind}, found {found}")
+        self.pos += 1
+        return token_value
+
+    def _expression(self):
+        children = [self._term()]
+        while self._peek() == ("keyword", "or"):
+            self.pos += 1
+            children.append(self._term())
+        return children[0] if len(children) == 1 else _Or(children)
+
+    def _term(self):
+        children = [self._factor()]
+        while self._peek() == ("keyword", "and"):
+            self.pos += 1
+            children.append(self._factor())
+        return children[0] if len(children) == 1 else _And(children)
+
+    def _factor(self):
+        token = self._peek()
+        if token == ("keyword", "not"):
+            self.pos += 1
+            return _Not(self._factor())
+        if token == ("paren", "("):
+            self.pos += 1
+            node = self._expression()
+            self._take("paren", ")")
+            return node
+        attribute = self._take("value")
+        op = self._take("op")
+        value = self._take("value")
+        return _Comparison(attribute, op, value)
+
+
+def parse_expression(text: str):
+    return _Parser(text).parse()
+
+
+class ExpressionFilter(Filter):
+    """
+    Boolean combination of attribute comparisons, e.g.
+        age >= 30 AND (city == "Novi Sad" OR NOT role == guest)
+
+    The expression is parsed once. Given a graph, apply() plans it against the
+    attribute indexes: conjuncts are ordered by estimated selectivity, indexed
+    comparisons produce candidate ids and the rest is evaluated as one compiled
+    predicate on the candidates only. Comparisons coerce the value like FilterFilter.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.type = "expression"
+        self._root = parse_expression(expression)
+        self._predicate = self._root.predicate()
+        self._indexable = list(dict.fromkeys(self._root.indexable_attributes()))
+
+    def apply(self, vertices: dict, graph=None) -> dict:
+        if graph is None:
+            predicate = self._predicate
+            return { key: node for key, node in vertices.items() if predicate(node) }
+
+        #Counts as a query on each attribute, so frequently filtered ones get indexed
+        for attribute in self._indexable:
+            graph.index_for_query(attribute)
+        ids, predicate = self._root.plan(graph)
+        if ids is not None:
+            if len(ids) < len(vertices):
+                vertices = { key: vertices[key] for key in ids if key in vertices }
+            else:
+                vertices = { key: node for key, node in vertices.items() if key in ids }
+            if predicate is None:
+                return vertices
+        elif np is not None and len(vertices) >= COLUMNAR_MIN_VERTICES:
+            mask = self.mask(graph.freeze())
+            if mask is not None:
+                return select_mask(graph.freeze(), mask, vertices)
+
+        return { key: node for key, node in vertices.items() if predicate(node) }
+
+    def uses_index(self, graph) -> bool:
+        return self._root.uses_index(graph)
+
+    #Boolean numpy array aligned with snapshot.ids, None if some comparison can't be vectorized
+    def mask(self, snapshot):
+        return self._root.mask(snapshot)
+
+    #Names of all attributes the expression compares
+    def attributes(self) -> list:
+        return list(dict.fromkeys(self._root.attributes()))
+
+    def matches(self, node) -> bool:
+        return self._predicate(node)
+
+    def serialize(self):
+        return {"type": self.type, "expression": self.expression}
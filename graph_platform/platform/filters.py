@@ -1,10 +1,28 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 
 from operator import eq, ne, gt, lt, ge, le
 
+from graph_index import value_family, numeric_value
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#Below this many vertices a plain Python scan is faster than building numpy columns
+COLUMNAR_MIN_VERTICES = 10000
+
 class Filter(ABC):
+    #vertices is the id -> Node dict left by the previous filters.
+    #graph is the unfiltered graph, filters may use its indexes.
+    @abstractmethod
+    def apply(self, vertices: dict, graph=None) -> dict:
+        pass
+
+    #Whether a single vertex passes the filter, used to update the view after one mutation
     @abstractmethod
-    def apply(self, vertices: dict) -> dict:
+    def matches(self, node) -> bool:
         pass
 
     @abstractmethod
@@ -16,10 +34,20 @@ class SearchFilter(Filter):
         self.attribute = attribute
         self.type = "search"
 
-    def apply(self, vertices: dict) -> dict:
+    def apply(self, vertices: dict, graph=None) -> dict:
+        if graph is not None:
+            candidates = graph.text_index().candidates(self.attribute)
+            if len(candidates) < len(vertices):
+                vertices = { key: vertices[key] for key in candidates if key in vertices }
+            else:
+                vertices = { key: node for key, node in vertices.items() if key in candidates }
+
         return { key: node for key, node in vertices.items()
-                    if any(self.attribute in str(k) or self.attribute in str(v)
-                        for k, v in node._attributes.items()) }
+                    if self.matches(node) }
+
+    def matches(self, node) -> bool:
+        return any(self.attribute in str(k) or self.attribute in str(v)
+                   for k, v in node._attributes.items())
     
     def serialize(self):
         return {"type": self.type, "attribute": self.attribute}
@@ -29,6 +57,8 @@ class FilterFilter(Filter):
         self.attribute = attribute
         self.type = type
         self.value = value
+        #value converted to each attribute value type it was compared with
+        self._coerced = {}
         match self.type:
             case ">":
                 self.operand = gt
@@ -42,10 +72,205 @@ class FilterFilter(Filter):
                 self.operand = eq
             case "!=":
                 self.operand = ne
+
+    def value_for(self, value_type):
+        if value_type not in self._coerced:
+            self._coerced[value_type] = coerce_value(self.value, value_type)
+        return self._coerced[value_type]
                 
-    def apply(self, vertices: dict) -> dict:
-        return { key: node for key, node in vertices.items()
-                 if self.attribute in node._attributes and self.operand(node._attributes[self.attribute], self.value) }
+    def apply(self, vertices: dict, graph=None) -> dict:
+        if graph is not None:
+            index = graph.index_for_query(self.attribute) if self.type != "!=" else None
+            if index is not None:
+                return self._apply_index(index, vertices)
+            if np is not None and len(vertices) >= COLUMNAR_MIN_VERTICES:
+                mask = self.mask(graph.freeze())
+                if mask is not None:
+                    return select_mask(graph.freeze(), mask, vertices)
+
+        return { key: node for key, node in vertices.items() if self.matches(node) }
+
+    #Whether apply() would answer from an attribute index of the graph
+    def uses_index(self, graph) -> bool:
+        return self.type != "!=" and graph.get_index(self.attribute) is not None
+
+    #Ids of the indexed vertices passing the filter, the value is coerced to every family in the index
+    def index_ids(self, index) -> list:
+        ids = []
+        for family in index.families():
+            value = self.value_for(family)
+            if value_family(value) is family:
+                ids.extend(index.lookup(self.type, value))
+        return ids
+
+    #Number of vertices index_ids would return
+    def index_count(self, index) -> int:
+        count = 0
+        for family in index.families():
+            value = self.value_for(family)
+            if value_family(value) is family:
+                count += index.count(self.type, value)
+        return count
+
+    def _apply_index(self, index, vertices: dict) -> dict:
+        ids = self.index_ids(index)
+        if len(ids) < len(vertices):
+            return { key: vertices[key] for key in ids if key in vertices }
+        matched = set(ids)
+        return { key: node for key, node in vertices.items() if key in matched }
+
+    #Evaluates the filter over a whole snapshot column at once.
+    #Returns a boolean numpy array aligned with snapshot.ids, or None if the column can't be vectorized.
+    def mask(self, snapshot):
+        column = snapshot.typed_column(self.attribute)
+        if column is None:
+            return None
+        values, present, value_type = column
+        value = self.value_for(value_type)
+        if value_type in (int, float):
+            if not isinstance(value, (int, float)):
+                return None
+        elif not isinstance(value, value_type):
+            return None
+        if value_type is datetime:
+            value = np.datetime64(value, "us")
+        return self.operand(values, value) & present
+
+    def matches(self, node) -> bool:
+        return self.matches_attributes(node._attributes)
+
+    def matches_attributes(self, attributes: dict) -> bool:
+        if self.attribute not in attributes:
+            return False
+        return self.matches_value(attributes[self.attribute])
+
+    def matches_value(self, value) -> bool:
+        other = self.value_for(type(value))
+        #Values of another family can't be ordered or equal, so only != matches them
+        if value_family(other) is not value_family(value):
+            return self.type == "!="
+        try:
+            return self.operand(value, other)
+        except TypeError:
+            return self.type == "!="
     
     def serialize(self):
-        return {"value": self.value, "type": self.type, "attribute": self.attribute}
\ No newline at end of file
+        return {"value": self.value, "type": self.type, "attribute": self.attribute}
+
+class EdgeFilter(Filter):
+    """
+    Keeps only the edges whose attribute compares true against a value,
+    e.g. weight > 5 or relation == friend. Vertices pass unchanged, the
+    platform collects edges() of every EdgeFilter into the filtered view.
+    Comparisons coerce the value like FilterFilter, edge values that read
+    as numbers (--property weight=10 on the CLI) compare as numbers, the
+    same way the edge index stores them.
+    """
+
+    def __init__(self, attribute: str, operator: str, value: str):
+        self.attribute = attribute
+        self.operator = operator
+        self.value = value
+        self.type = "edge"
+        self._comparison = FilterFilter(attribute, operator, value)
+
+    def apply(self, vertices: dict, graph=None) -> dict:
+        return vertices
+
+    def matches(self, node) -> bool:
+        return True
+
+    def matches_edge(self, attributes: dict) -> bool:
+        if self.attribute not in attributes:
+            return False
+        return self._comparison.matches_value(numeric_value(attributes[self.attribute]))
+
+    #Set of (source id, target id) pairs of the graph passing the filter, answered from an edge index
+    def edges(self, graph) -> set:
+        if self.operator != "!=":
+            return set(self._comparison.index_ids(graph.create_edge_index(self.attribute)))
+        return {(source, target) for source, targets in graph._edges.items()
+                    for target, attrs in targets.items() if self.matches_edge(attrs)}
+
+    def serialize(self):
+        return {"type": self.type, "attribute": self.attribute, "operator": self.operator, "value": self.value}
+
+
+#Converts a filter value typed as text (CLI, /filter/) to the type of the attribute values it is compared with.
+#Values that can't be converted are returned unchanged.
+def coerce_value(value, value_type):
+    if not isinstance(value, str) or value_type is str:
+        return value
+    try:
+        if value_type in (int, float):
+            try:
+                return int(value)
+            except ValueError:
+                return float(value)
+        if value_type is datetime:
+            return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    return value
+
+
+#Turns a boolean mask over snapshot.ids into an id -> Node dict, keeping only ids present in vertices
+def select_mask(snapshot, mask, vertices: dict) -> dict:
+    ids = snapshot.ids
+    result = {}
+    for i in np.flatnonzero(mask).tolist():
+        key = ids[i]
+        node = vertices.get(key)
+        if node is not None:
+            result[key] = node
+    return result
+
+
+#Applies a filter chain, evaluating runs of consecutive filters that have a mask()
+#(FilterFilter, ExpressionFilter) and don't use an index as one vectorized mask
+#when numpy is available and the graph is large enough. On graphs of at least
+#parallel_filters.PARALLEL_MIN_VERTICES vertices the mask is computed by worker processes.
+#on_result(count, vertices) is called with the result after the first count filters,
+#for every prefix whose result gets materialized.
+def apply_filter_chain(filters: list, vertices: dict, graph, start: int = 0, on_result=None) -> dict:
+    import parallel_filters
+    i = start
+    while i < len(filters):
+        mask = None
+        j = i
+        if np is not None and graph is not None and len(vertices) >= COLUMNAR_MIN_VERTICES:
+            snapshot = graph.freeze()
+            end = i
+            while end < len(filters) and hasattr(filters[end], "mask") and not filters[end].uses_index(graph):
+                end += 1
+            if end > i and len(snapshot) >= parallel_filters.PARALLEL_MIN_VERTICES:
+                mask = parallel_filters.get_evaluator().mask(snapshot, filters[i:end])
+                if mask is not None:
+                    j = end
+            if mask is None:
+                while j < end:
+                    column_mask = filters[j].mask(snapshot)
+                    if column_mask is None:
+                        break
+                    mask = column_mask if mask is None else mask & column_mask
+                    j += 1
+
+        if mask is not None:
+            vertices = select_mask(snapshot, mask, vertices)
+            i = j
+        else:
+            vertices = filters[i].apply(vertices, graph)
+            i += 1
+        if on_result is not None:
+            on_result(i, vertices)
+    return vertices
+
+
+#Intersection of the edges() of the EdgeFilters in a chain, None if the chain has none
+def filter_edges(filters: list, graph):
+    allowed = None
+    for f in filters:
+        if isinstance(f, EdgeFilter):
+            edges = f.edges(graph)
+            allowed = edges if allowed is None else allowed & edges
+    return allowed
@@ -1,8 +1,26 @@
 from collections.abc import Callable
+from contextlib import contextmanager
+import functools
 import json
-from graph_api import Graph, GraphVisualizer, Node
+import threading
+from graph_api import Graph, GraphVisualizer, Node, FilteredGraphView, VERTEX_ADDED, VERTEX_EDITED, VERTEX_REMOVED, EDGE_REMOVED
 from TreeVIew.tree_view import TreeNode, ForestView
-from filters import Filter
+from graph_json import graph_data, graph_json
+from filters import Filter, EdgeFilter, apply_filter_chain, filter_edges
+from filter_cache import FilterCache
+
+#Seconds mutations are collected before the views are updated once for all of them, 0 updates after every mutation
+UPDATE_DEBOUNCE_SECONDS = 0.05
+
+
+#Runs the method under the platform lock, the debounce timer updates the views from its own thread
+def _synchronized(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class Platform():
     _instance = None  # store the singleton instance
@@ -21,11 +39,26 @@ class Platform():
 
         self.file_path = file_path
         self.graph_update_listeners = []
+        self.selection_listeners = []
         self.graph = graph
         self._filtered_graph = graph
+        #What _filtered_graph was computed from, so it can be patched instead of rebuilt
+        self._view_graph = None
+        self._view_filters = ()
+        self._view_version = 0
+        self.filter_cache = FilterCache()
         self.visualizer = visualizer
         self.forestView = ForestView(graph)
         self.selected_node = None
+        #Mutations only mark the views as stale, they are updated when a batch ends,
+        #when the debounce window closes or before anything reads them
+        self._lock = threading.RLock()
+        self.update_debounce = UPDATE_DEBOUNCE_SECONDS
+        self._batch_depth = 0
+        self._update_pending = False
+        self._update_timer = None
+        #What the last debounced update raised on the timer thread, raised again by the next flush_updates
+        self._update_error = None
 
     #graph update listener
     def attach_update_listener(self, func: Callable[[None],None]):
@@ -41,76 +74,174 @@ class Platform():
         for func in self.graph_update_listeners:
             func()
 
+    #selection listener, called with the selected id (None when cleared) and the node ids from its tree root down to it
+    def attach_selection_listener(self, func: Callable[[str, list], None]):
+        if func not in self.selection_listeners:
+            self.selection_listeners.append(func)
+
+    def detach_selection_listener(self, func: Callable[[str, list], None]):
+        if func in self.selection_listeners:
+            self.selection_listeners.remove(func)
+
+    #Selection only touches the tree nodes on the way to the selected node, the graph views stay as they are
+    def _selection_changed(self, node_id, path):
+        for func in self.selection_listeners:
+            func(node_id, path)
+
+    #Batching stuff
+    @contextmanager
+    def batch(self):
+        """
+        Updates the views and notifies the listeners once for all mutations made inside:
+            with platform.batch():
+                for id1, id2 in edges:
+                    platform.create_edge(id1, id2)
+        Batches can be nested, other threads wait until the outermost one ends.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._update_pending:
+                    self.update_graph_view()
+
+    #Called by mutations instead of update_graph_view
+    def _schedule_update(self):
+        self._update_pending = True
+        if self._batch_depth or self._update_timer is not None:
+            return
+        if self.update_debounce <= 0:
+            self.update_graph_view()
+            return
+        self._update_timer = threading.Timer(self.update_debounce, self._debounced_update)
+        self._update_timer.daemon = True
+        self._update_timer.start()
+
+    #Runs on the timer thread, where an exception would go unnoticed: it is kept for flush_updates.
+    #The mutations stay pending, so the views are updated again on the next flush.
+    @_synchronized
+    def _debounced_update(self):
+        if self._update_pending and not self._batch_depth:
+            try:
+                self.update_graph_view()
+            except Exception as error:
+                self._update_error = error
+
+    @_synchronized
+    def flush_updates(self):
+        """
+        Updates the views with pending mutations now instead of when the debounce window closes.
+        Raises what a debounced update raised since the last flush, the next flush tries again.
+        """
+        error, self._update_error = self._update_error, None
+        if error is not None:
+            raise error
+        if self._update_pending and not self._batch_depth:
+            self.update_graph_view()
+
     #Graph stuff
     
     #Returns a json with all nodes, edges, and their attributes
+    @_synchronized
     def get_graph_data(self):
-        parsedNodes = []
-        for node in self._filtered_graph._vertices.values():
-            parsedNodes.append({"attributes": node._attributes})
-
-        parsedLinks = []
-        for source, targets in self._filtered_graph._edges.items():
-            for target in targets:
-                parsedLinks.append({"source": source, "target": target, "attrs": self._filtered_graph._edges[source][target]})
-        
-        return {'nodes': parsedNodes, 'links': parsedLinks}
+        self.flush_updates()
+        return graph_data(self._filtered_graph)
+
+    #The same already serialized, as (tag, text). The text is only rebuilt when the view changes.
+    @_synchronized
+    def get_graph_json(self):
+        self.flush_updates()
+        return graph_json(self._filtered_graph)
 
+    @_synchronized
     def add_vertex(self, vertex: Node) -> bool:
         if not self.graph.add_vertex(vertex):
             return False
         self.visualizer.add_node(vertex)
-        self.update_graph_view()
+        self._schedule_update()
         return True
 
+    @_synchronized
     def edit_vertex(self, vertex: Node) -> bool:
         if not self.graph.edit_vertex(vertex):
             return False
         self.visualizer.edit_node(vertex)
-        self.update_graph_view()
+        self._schedule_update()
         return True
 
+    @_synchronized
     def create_vertex(self) -> Node:
         node = self.graph.create_vertex()
         self.visualizer.add_node(node)
-        self.update_graph_view()
+        self._schedule_update()
         return node
     
+    @_synchronized
     def delete_vertex(self, vertex: Node) -> None:
         attr = self.graph.delete_vertex(vertex)
         self.visualizer.remove_node(vertex)
-        self.update_graph_view()
+        self._schedule_update()
         return attr
     
+    #Graph.edit_edge moves the first edge out of old_source to new_target, so the old link is removed too
+    @_synchronized
     def edit_edge(self, old_source: str, new_target: str, **attrs) -> None:
+        old_target = next(iter(self.graph._edges.get(old_source, ())), None)
         self.graph.edit_edge(old_source, new_target, **attrs)
-        self.visualizer.edit_link(old_source, new_target)
-        self.update_graph_view()
+        if old_target is not None:
+            if old_target != new_target:
+                self.visualizer.remove_link(old_source, old_target)
+            self.visualizer.edit_link(old_source, new_target, **attrs)
+        self._schedule_update()
 
+    @_synchronized
     def delete_edge(self, node1_id: str, node2_id: str) -> bool:
         ret = self.graph.delete_edge(node1_id, node2_id)
-        self.update_graph_view()
+        if ret:
+            self.visualizer.remove_link(node1_id, node2_id)
+        self._schedule_update()
         return ret
 
+    @_synchronized
     def create_edge(self, id1: str, id2: str, **attrs) -> None:
         self.graph.create_edge(id1, id2, **attrs)
-        self.visualizer.add_link(id1, id2)
-        self.update_graph_view()
+        self.visualizer.add_link(id1, id2, **attrs)
+        self._schedule_update()
 
     #TreeView stuff
-    def get_tree_view(self) -> str:
+    #A window of the visible tree rows, attributes are fetched separately with get_node_attributes
+    @_synchronized
+    def get_tree_view(self, offset: int = 0, limit: int = 100) -> dict:
+        self.flush_updates()
         data = {
             'selected_id': self.selected_node.get_id() if self.selected_node is not None else None,
-            'treeview': self.forestView.convert_to_json()
+            'revision': self.forestView.revision,
+            'total': self.forestView.row_count(),
+            'offset': offset,
+            'rows': self.forestView.get_rows(offset, limit)
                 }
         return data
+
+    @_synchronized
+    def get_node_attributes(self, node_id: str) -> dict:
+        self.flush_updates()
+        node = self._filtered_graph._vertices.get(node_id)
+        if node is None:
+            return None
+        return node.get_attributes()
     
+    @_synchronized
     def expand_tree_view(self, tree_id: str):
+        self.flush_updates()
         print("Tree id " + tree_id)
         self.forestView.expand_node_by_tree_id(tree_id)
         self._graph_updated()
 
+    @_synchronized
     def collapse_tree_view(self, tree_id: str):
+        self.flush_updates()
         self.forestView.collapse_node_by_tree_id(tree_id)
         self._graph_updated()
 
@@ -122,75 +253,128 @@ class Platform():
         self.visualizer = visualizer
         self.visualizer.on_switched_to()
 
+    @_synchronized
     def generate_main_view(self) -> str:
-        ret = self.visualizer.visualize_graph(self.graph, self.selected_node)
+        self.flush_updates()
+        ret = self.visualizer.visualize_graph(self._filtered_graph, self.selected_node)
         self.visualizer.on_selection_changed(self.selected_node)
         return ret
     
     #Selection stuff
+    @_synchronized
     def select_node(self, node_id: str) -> Node:
+        self.flush_updates()
         node = self.graph._vertices.get(node_id)
         if node is None:
             return None
         
         self.selected_node = node
-        self.forestView.expand_path_to_node(node_id)
-        self._graph_updated()
+        path = self.forestView.select(node_id)
+        self._selection_changed(node_id, path)
         self.visualizer.on_selection_changed(node)
         return self.selected_node
     
+    @_synchronized
     def deselect_node(self):
+        self.flush_updates()
         self.selected_node = None
-        self._graph_updated()
+        self.forestView.select(None)
+        self._selection_changed(None, None)
         self.visualizer.on_selection_changed(None)
 
     #Filter stuff
 
+    #The forest view is kept across updates: it catches up with the change log itself
+    #and is only rebuilt when the filtered view was replaced
+    @_synchronized
     def update_graph_view(self):
-        self._create_filtered_graph()
-        self.forestView = ForestView(self._filtered_graph)
-        self._graph_updated()
-        self.visualizer.revisualize_graph(self._filtered_graph)
+        #Cleared first so mutations made by listeners schedule another update, restored if this one fails
+        self._update_pending = False
+        if self._update_timer is not None:
+            self._update_timer.cancel()
+            self._update_timer = None
+        try:
+            self._refresh_filtered_graph()
+            if self.forestView.graph is not self._filtered_graph:
+                self.forestView.set_graph(self._filtered_graph)
+            self._graph_updated()
+            self.visualizer.revisualize_graph(self._filtered_graph)
+        except BaseException:
+            self._update_pending = True
+            raise
+        self._update_error = None
 
     def get_filters(self):
         return self.graph._filters
 
+    @_synchronized
     def add_filter(self, filter: Filter):
         self.graph.add_filter(filter)
-        self.update_graph_view()
+        self._schedule_update()
 
+    @_synchronized
     def remove_filter(self, index: int):
         self.graph.remove_filter(index)
-        self.update_graph_view()
+        self._schedule_update()
     
-    def _create_filtered_graph(self):
-        self._filtered_graph = Graph(self.graph._is_directed)
+    #Patches the filtered view with the changes made since it was computed.
+    #Falls back to re-running the whole filter chain when the filters or the graph
+    #were replaced, or when the change log no longer reaches back far enough.
+    def _refresh_filtered_graph(self):
+        filters = tuple(self.graph._filters)
+        changes = None
+        if self._view_graph is self.graph and self._view_filters == filters:
+            changes = self.graph.changes_since(self._view_version)
 
-        for node_id, attrs in self.graph._vertices.items():
-            node = Node(node_id)
-            for key, value in attrs._attributes.items():
-                if (key == 'id'):
-                    continue
-                node.set_attribute(key, value)
-            
-            self._filtered_graph.add_vertex(node)
+        if changes is None:
+            self._create_filtered_graph()
+        elif filters:
+            vertices = self._filtered_graph._vertices
+            allowed = self._filtered_graph._allowed_edges
+            edge_filters = [f for f in filters if isinstance(f, EdgeFilter)]
+            for change in changes:
+                if change.type == VERTEX_ADDED or change.type == VERTEX_EDITED:
+                    node = self.graph._vertices.get(change.vertex_id)
+                    if node is not None and all(f.matches(node) for f in filters):
+                        vertices[change.vertex_id] = node
+                    else:
+                        vertices.pop(change.vertex_id, None)
+                elif change.type == VERTEX_REMOVED:
+                    vertices.pop(change.vertex_id, None)
+                elif allowed is not None:
+                    edge = (change.vertex_id, change.target_id)
+                    attrs = self.graph._edges.get(change.vertex_id, {}).get(change.target_id)
+                    if change.type != EDGE_REMOVED and attrs is not None and all(f.matches_edge(attrs) for f in edge_filters):
+                        allowed.add(edge)
+                    else:
+                        allowed.discard(edge)
 
-        print(self.graph._filters)
+        self._view_graph = self.graph
+        self._view_filters = filters
+        self._view_version = self.graph.version
 
-        for filter in self.graph._filters:
-            self._filtered_graph._vertices = filter.apply(self._filtered_graph._vertices)
-        
-        node_mapping = {}
-        for node_id, node in self.graph._vertices.items():
-            node_mapping[node_id] = node
+    #Runs the filter chain and exposes the result as a view over self.graph, nothing is copied.
+    #Starts from the longest prefix of the chain already in filter_cache and caches every new prefix.
+    def _create_filtered_graph(self):
+        filters = self.graph._filters
+        if not filters:
+            self._filtered_graph = self.graph
+            return
+
+        if self._view_graph is not self.graph:
+            self.filter_cache.clear()
+        start, vertices = self.filter_cache.lookup(self.graph, filters)
+        if vertices is None:
+            vertices = self.graph._vertices
+        vertices = apply_filter_chain(filters, vertices, self.graph, start,
+                                      lambda count, result: self.filter_cache.store(self.graph, filters, count, result))
 
-        for source, targets in self.graph._edges.items():
-            if source in node_mapping:
-                for target in targets:
-                    if target in node_mapping:
-                        self._filtered_graph.create_edge(node_mapping[source].get_id(), node_mapping[target].get_id(), **self.graph._edges[source][target])
+        if vertices is self.graph._vertices:
+            vertices = dict(vertices)
+        self._filtered_graph = FilteredGraphView(self.graph, vertices, filter_edges(filters, self.graph))
 
 
+    @_synchronized
     def set_graph(self, new_graph: Graph):
         """
         Replace the current graph with a new one.
@@ -0,0 +1,189 @@
+"""
+Multi-process evaluation of vectorizable filter runs on very large graphs.
+
+The typed snapshot columns the filters read are copied once into shared
+memory blocks; workers attach to them by name, evaluate the filters on their
+shard of rows and write the result into a shared boolean buffer. Nothing but
+the block names and the serialized filters is pickled.
+"""
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from filters import FilterFilter
+from filter_expression import ExpressionFilter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#Snapshots with at least this many vertices are filtered in worker processes
+PARALLEL_MIN_VERTICES = 2000000
+#Number of worker processes, one per core by default
+PARALLEL_WORKERS = os.cpu_count() or 1
+
+
+class _ShardColumns(object):
+    """Stands in for a GraphSnapshot inside a worker, Filter.mask() only needs typed_column."""
+
+    def __init__(self, columns: dict) -> None:
+        self._columns = columns
+
+    def typed_column(self, attr_name: str):
+        return self._columns.get(attr_name)
+
+
+def _spec(f) -> tuple:
+    if isinstance(f, ExpressionFilter):
+        return ("expression", f.expression)
+    return ("filter", (f.attribute, f.type, f.value))
+
+
+def _rebuild(spec):
+    kind, data = spec
+    if kind == "expression":
+        return ExpressionFilter(data)
+    return FilterFilter(*data)
+
+
+def _attributes(f) -> list:
+    if isinstance(f, ExpressionFilter):
+        return f.attributes()
+    return [f.attribute]
+
+
+#Runs in a worker: ANDs the masks of the filters over rows start:stop and stores them in the output block.
+#Returns False if a filter can't be vectorized.
+def _evaluate_shard(specs: list, columns: dict, size: int, start: int, stop: int, output_name: str) -> bool:
+    blocks = []
+    try:
+        return _write_shard_mask(specs, columns, size, start, stop, output_name, blocks)
+    finally:
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                #an exception traceback still references arrays over the block
+                pass
+
+
+def _write_shard_mask(specs, columns, size, start, stop, output_name, blocks) -> bool:
+    arrays = {}
+    for attr_name, (values_name, present_name, dtype, value_type) in columns.items():
+        values_block = shared_memory.SharedMemory(name=values_name)
+        present_block = shared_memory.SharedMemory(name=present_name)
+        blocks.extend((values_block, present_block))
+        values = np.ndarray((size,), dtype=dtype, buffer=values_block.buf)
+        present = np.ndarray((size,), dtype=bool, buffer=present_block.buf)
+        arrays[attr_name] = (values[start:stop], present[start:stop], value_type)
+
+    shard = _ShardColumns(arrays)
+    mask = None
+    for spec in specs:
+        filter_mask = _rebuild(spec).mask(shard)
+        if filter_mask is None:
+            return False
+        mask = filter_mask if mask is None else mask & filter_mask
+
+    output_block = shared_memory.SharedMemory(name=output_name)
+    blocks.append(output_block)
+    output = np.ndarray((size,), dtype=bool, buffer=output_block.buf)
+    output[start:stop] = mask
+    return True
+
+
+class ParallelFilterEvaluator(object):
+    """
+    Evaluates runs of FilterFilters and ExpressionFilters over a GraphSnapshot
+    in a ProcessPoolExecutor, one shard of rows per task.
+
+    Shared columns are kept for the last snapshot only and released when
+    another snapshot is evaluated, workers are started on first use.
+    """
+
+    def __init__(self, workers: int = None) -> None:
+        self.workers = workers or PARALLEL_WORKERS
+        self._executor = None
+        self._snapshot = None
+        self._columns = {}   #attribute -> (values block, present block, dtype, value_type)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            #spawn instead of fork, the platform runs inside a threaded server
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _share(self, snapshot, attr_name: str):
+        if snapshot is not self._snapshot:
+            self._release()
+            self._snapshot = snapshot
+        entry = self._columns.get(attr_name)
+        if entry is None:
+            typed = snapshot.typed_column(attr_name)
+            if typed is None:
+                return None
+            values, present, value_type = typed
+            values_block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            present_block = shared_memory.SharedMemory(create=True, size=max(present.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=values_block.buf)[:] = values
+            np.ndarray(present.shape, dtype=bool, buffer=present_block.buf)[:] = present
+            entry = self._columns[attr_name] = (values_block, present_block, values.dtype.str, value_type)
+        values_block, present_block, dtype, value_type = entry
+        return (values_block.name, present_block.name, dtype, value_type)
+
+    #Boolean mask over snapshot.ids of the vertices passing all filters, None if one can't be vectorized
+    def mask(self, snapshot, filters: list):
+        if np is None:
+            return None
+        columns = {}
+        for f in filters:
+            for attr_name in _attributes(f):
+                shared = self._share(snapshot, attr_name)
+                if shared is None:
+                    return None
+                columns[attr_name] = shared
+
+        size = len(snapshot)
+        specs = [_spec(f) for f in filters]
+        shard_count = min(self.workers, size)
+        bounds = [size * k // shard_count for k in range(shard_count + 1)]
+        output = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            pool = self._pool()
+            futures = [pool.submit(_evaluate_shard, specs, columns, size, bounds[k], bounds[k + 1], output.name)
+                       for k in range(shard_count)]
+            if not all(future.result() for future in futures):
+                return None
+            return np.ndarray((size,), dtype=bool, buffer=output.buf).copy()
+        finally:
+            output.close()
+            output.unlink()
+
+    def _release(self) -> None:
+        for values_block, present_block, _, _ in self._columns.values():
+            for block in (values_block, present_block):
+                block.close()
+                block.unlink()
+        self._columns.clear()
+        self._snapshot = None
+
+    def close(self) -> None:
+        self._release()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+_evaluator = None
+
+
+#Evaluator shared by apply_filter_chain, created with PARALLEL_WORKERS on first use
+def get_evaluator() -> ParallelFilterEvaluator:
+    global _evaluator
+    if _evaluator is None:
+        _evaluator = ParallelFilterEvaluator()
+        atexit.register(_evaluator.close)
+    return _evaluator
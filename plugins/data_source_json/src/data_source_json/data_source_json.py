@@ -2,19 +2,25 @@ from abc import ABC
 from datasource_api import DataSourcePlugin
 import json
 import networkx as nx
-from graph_api import Node, Graph, GraphVisualizer
+from graph_api import Graph, GraphVisualizer
 from datetime import datetime
 
 class JSONDataSource(DataSourcePlugin, ABC):
     def __init__(self, **kwargs):
         self.json_file = kwargs.get("file_path")
         self.graph = Graph(directed=True)
+        self._vertices = []     #(id, attributes), filled by build_graph
+        self._edges = []        #(source id, target id, attributes)
 
     def load_graph(self, **kwargs):
         with open(self.json_file, 'r') as f:
             data = json.load(f)
 
+        self._vertices = []
+        self._edges = []
         self.build_graph(data)
+        self.graph.add_vertices(self._vertices)
+        self.graph.create_edges(self._edges)
         return self.graph
     
     def get_input_fields(self) -> list[str]:
@@ -23,26 +29,25 @@ class JSONDataSource(DataSourcePlugin, ABC):
         """
         return ["file_path"]
 
-    def build_graph(self, data, parent_node: Node = None):
+    #Collects (id, attributes) and (source, target, attributes) tuples,
+    #which load_graph then adds to the graph in two batches
+    def build_graph(self, data, parent_id: str = None):
         if isinstance(data, dict):
             for key, value in data.items():
+                node_id = str(key) + "_" + str(id(value))
                 if isinstance(value, dict) or isinstance(value, list):
-                    node = Node(id=str(key) + "_" + str(id(value)))
-                    node.set_attribute("name", key)
-                    self.graph.add_vertex(node)
+                    self._vertices.append((node_id, {"name": key}))
 
-                    if parent_node:
-                        self.graph.create_edge(parent_node.get_id(), node.get_id())
+                    if parent_id is not None:
+                        self._edges.append((parent_id, node_id, None))
 
-                    self.build_graph(value, node)
+                    self.build_graph(value, node_id)
                 else:
-                    node = Node(id=str(key) + "_" + str(id(value)))
-                    node.set_attribute("name", value)
-                    self.graph.add_vertex(node)
+                    self._vertices.append((node_id, {"name": value}))
 
-                    if parent_node:
-                        self.graph.create_edge(parent_node.get_id(), node.get_id())
+                    if parent_id is not None:
+                        self._edges.append((parent_id, node_id, None))
 
         elif isinstance(data, list):
             for item in data:
-                self.build_graph(item, parent_node)
+                self.build_graph(item, parent_id)
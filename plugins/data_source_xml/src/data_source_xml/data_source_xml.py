@@ -1,6 +1,6 @@
 from abc import ABC
 from datasource_api import DataSourcePlugin
-from graph_api import Graph, Node
+from graph_api import Graph
 import xml.etree.ElementTree as ET
 import uuid
 from datetime import datetime
@@ -12,7 +12,8 @@ class XmlDataSourcePlugin(DataSourcePlugin, ABC):
     """
 
     def __init__(self, **kwargs):
-        self.node_map = {}
+        self.node_map = {}       #node_id -> attributes, added to the graph in one batch
+        self.edges = []          #(parent_id, child_id, attributes)
         self.pending_refs = []   #(parent_id, ref_target)
         self.id_attr = kwargs.get("id_attr", "id")
         self.ref_attr = kwargs.get("ref_attr", "ref")
@@ -32,16 +33,19 @@ class XmlDataSourcePlugin(DataSourcePlugin, ABC):
         graph = Graph(directed=self.directed)
 
         self.node_map = {}
+        self.edges = []
         self.pending_refs = []
-        self._parse_element(root, graph, parent_node=None)
+        self._parse_element(root, parent_id=None)
 
         #resolve references after all nodes are parsed
         for parent_id, ref_target in self.pending_refs:
             if ref_target in self.node_map:
-                graph.create_edge(parent_id, self.node_map[ref_target].get_id())
+                self.edges.append((parent_id, ref_target, None))
             else:
                 print(f"Warning: unresolved reference '{ref_target}'")
 
+        graph.add_vertices(self.node_map.items())
+        graph.create_edges(self.edges)
         return graph
 
     def get_input_fields(self) -> list[str]:
@@ -61,49 +65,44 @@ class XmlDataSourcePlugin(DataSourcePlugin, ABC):
             pass
         return value
 
-    def _parse_element(self, element, graph: Graph, parent_node: Node = None):
-        """Recursively parse XML element into Graph nodes and edges."""
+    def _parse_element(self, element, parent_id: str = None):
+        """Recursively collect XML elements as node attributes and edges."""
         #check for reference
         ref_target = element.attrib.get(self.ref_attr)
         if ref_target:
             if ref_target in self.node_map:
-                target_node = self.node_map[ref_target]
-                if parent_node:
-                    graph.create_edge(parent_node.get_id(), target_node.get_id())
-                return target_node
+                if parent_id is not None:
+                    self.edges.append((parent_id, ref_target, None))
+                return ref_target
             else:
-                if parent_node:
-                    self.pending_refs.append((parent_node.get_id(), ref_target))
+                if parent_id is not None:
+                    self.pending_refs.append((parent_id, ref_target))
                 return None
 
         #element has children - make a node
         if len(element) > 0:
             node_id = element.attrib.get(self.id_attr, f"{element.tag}_{uuid.uuid4().hex[:6]}")
-            if node_id in self.node_map:
-                node = self.node_map[node_id]
-            else:
-                node = Node(id=node_id)
-                node.set_attribute("tag", element.tag)
+            if node_id not in self.node_map:
+                attributes = {"tag": element.tag}
 
                 #copy attributes except id/ref
                 for k, v in element.attrib.items():
                     if k not in (self.id_attr, self.ref_attr):
-                        node.set_attribute(k, self._convert_value(v))
+                        attributes[k] = self._convert_value(v)
 
-                graph.add_vertex(node)
-                self.node_map[node_id] = node
+                self.node_map[node_id] = attributes
 
-            if parent_node:
-                graph.create_edge(parent_node.get_id(), node.get_id())
+            if parent_id is not None:
+                self.edges.append((parent_id, node_id, None))
 
             #recursion
             for child in element:
-                self._parse_element(child, graph, parent_node=node)
+                self._parse_element(child, parent_id=node_id)
 
-            return node
+            return node_id
 
         #element has no children - treat as attribute
         else:
-            if parent_node is not None and element.text and element.text.strip():
-                parent_node.set_attribute(element.tag, self._convert_value(element.text.strip()))
-            return parent_node
\ No newline at end of file
+            if parent_id is not None and element.text and element.text.strip():
+                self.node_map[parent_id][element.tag] = self._convert_value(element.text.strip())
+            return parent_id
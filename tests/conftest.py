@@ -0,0 +1,7 @@
+import os
+import sys
+
+#The packages import each other by module name, like the explorer does with the editable installs
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in ("api/api", "graph_platform/platform"):
+    sys.path.insert(0, os.path.join(_ROOT, _path))
@@ -0,0 +1,148 @@
+import random
+from bisect import insort
+
+from graph_api import Graph, Node
+from components import ComponentIndex
+
+
+#Components of graph by breadth-first search, edges taken in either direction
+def _reference_components(g: Graph) -> list:
+    seen = set()
+    components = []
+    for vid in g._vertices:
+        if vid in seen:
+            continue
+        component = {vid}
+        frontier = [vid]
+        while frontier:
+            current = frontier.pop()
+            for neighbor in list(g._edges.get(current, ())) + list(g._in_edges.get(current, ())):
+                if neighbor not in component:
+                    component.add(neighbor)
+                    frontier.append(neighbor)
+        seen |= component
+        components.append(component)
+    return components
+
+
+def _distances(g: Graph, start) -> dict:
+    distances = {start: 0}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for current in frontier:
+            for neighbor in list(g._edges.get(current, ())) + list(g._in_edges.get(current, ())):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[current] + 1
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances
+
+
+def _chain(ids) -> Graph:
+    g = Graph(False)
+    for vid in ids:
+        g.add_vertex(Node(vid))
+    for a, b in zip(ids, ids[1:]):
+        g.create_edge(a, b)
+    return g
+
+
+def test_deletions_split_lazily():
+    g = _chain(["a", "b", "c", "d", "e"])
+    index = ComponentIndex(g)
+    assert index.count() == 1
+
+    g.delete_edge("b", "c")
+    index.remove_edge("b", "c")
+    #Only the endpoints are recorded, the split happens on the next query
+    assert index._suspects
+    assert index.size("a") == 2 and index.size("e") == 3
+    assert not index._suspects
+    assert index.representative("e") == "c"
+
+    #Removing an edge inside a cycle doesn't split anything
+    g.create_edge("e", "c")
+    index.add_edge("e", "c")
+    g.delete_edge("c", "d")
+    index.remove_edge("c", "d")
+    assert index.count() == 2 and index.size("d") == 3
+
+
+def test_roots_follow_insertion_order_through_random_edits():
+    for seed in range(20):
+        rng = random.Random(seed)
+        g = Graph(seed % 2 == 0)
+        for i in range(30):
+            g.add_vertex(Node(str(i)))
+        order = {str(i): i for i in range(30)}
+        next_order = 30
+        index = ComponentIndex(g)
+        #A copy of the roots kept up to date from root_changes() only
+        roots = [(index.order(vid), vid) for vid in index.roots()]
+
+        for step in range(200):
+            r = rng.random()
+            a, b = str(rng.randrange(40)), str(rng.randrange(40))
+            if r < 0.45:
+                if a != b and a in g._vertices and b in g._vertices:
+                    g.create_edge(a, b)
+                    index.add_edge(a, b)
+            elif r < 0.75:
+                if b in g._edges.get(a, {}):
+                    g.delete_edge(a, b)
+                    index.remove_edge(a, b)
+            elif r < 0.85:
+                if a not in g._vertices:
+                    g.add_vertex(Node(a))
+                    index.add_vertex(a)
+                    order[a] = next_order
+                    next_order += 1
+            elif a in g._vertices:
+                edges = [(a, target) for target in g._edges.get(a, ())] + [(source, a) for source in g._in_edges.get(a, ())]
+                g.delete_vertex(Node(a))
+                for source, target in edges:
+                    index.remove_edge(source, target)
+                index.remove_vertex(a)
+                del order[a]
+
+            if rng.random() < 0.3:
+                continue
+            expected = sorted((min(component, key=order.__getitem__) for component in _reference_components(g)),
+                              key=order.__getitem__)
+            assert index.roots() == expected, (seed, step)
+            removed, added = index.root_changes()
+            for key in removed:
+                roots.remove(key)
+            for key in added:
+                insort(roots, key)
+            assert [vid for _, vid in roots] == expected, (seed, step)
+
+
+def test_paths_are_shortest_and_follow_edits():
+    g = _chain([str(i) for i in range(8)])
+    index = ComponentIndex(g)
+
+    def check(vid):
+        path = index.path(vid)
+        assert path[0] == index.representative(vid) and path[-1] == vid
+        assert len(path) - 1 == _distances(g, path[0])[vid]
+        for a, b in zip(path, path[1:]):
+            assert b in g._edges.get(a, {}) or a in g._edges.get(b, {})
+        return path
+
+    assert check("7") == [str(i) for i in range(8)]
+    #The cached tree is dropped when a shortcut appears
+    g.create_edge("0", "6")
+    index.add_edge("0", "6")
+    assert check("7") == ["0", "6", "7"]
+    #and when an edge on the path goes away
+    g.delete_edge("0", "6")
+    index.remove_edge("0", "6")
+    assert check("7") == [str(i) for i in range(8)]
+    #and when the first vertex is removed
+    g.delete_edge("0", "1")
+    index.remove_edge("0", "1")
+    g.delete_vertex(Node("0"))
+    index.remove_vertex("0")
+    assert check("7") == [str(i) for i in range(1, 8)]
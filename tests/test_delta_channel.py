@@ -0,0 +1,73 @@
+import socket
+
+import pytest
+
+from graph_api import Graph, Node
+from delta_channel import GraphDeltaChannel
+
+
+#A channel that keeps its messages instead of sending them
+class _RecordingChannel(GraphDeltaChannel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = []
+
+    def _send(self, message: dict) -> None:
+        self.messages.append(message)
+
+
+def _ops(channel: _RecordingChannel) -> list:
+    return sorted((op["op"], op.get("source"), op.get("target")) for op in channel.messages[-1]["ops"])
+
+
+def test_edited_edge_removes_the_old_link():
+    g = Graph(True)
+    for vid in "abc":
+        g.add_vertex(Node(vid))
+    g.create_edge("a", "b", w=1)
+    channel = _RecordingChannel()
+    channel.reset(g)
+
+    g.edit_edge("a", "c", w=2)
+    channel.publish(g)
+    message = channel.messages[-1]
+    assert message["type"] == "delta" and message["version"] == g.version
+    assert _ops(channel) == [("link", "a", "c"), ("remove_link", "a", "b")]
+
+
+def test_publish_resets_when_the_log_does_not_reach_back():
+    g = Graph(True)
+    g.add_vertex(Node("a"))
+    channel = _RecordingChannel()
+    channel.reset(g)
+    g._changes.clear()
+    g.add_vertex(Node("b"))
+    g._changes.clear()
+    channel.publish(g)
+    assert channel.messages[-1] == {"type": "reset", "version": g.version}
+
+
+def test_channel_is_disabled_when_the_port_is_taken():
+    pytest.importorskip("websockets")
+    with socket.socket() as taken:
+        taken.bind(("localhost", 0))
+        taken.listen()
+        channel = GraphDeltaChannel(port=taken.getsockname()[1])
+        assert channel.enabled
+        assert not channel.start()
+        assert not channel.enabled
+
+
+def test_visualizers_share_the_layout_read_once(tmp_path, monkeypatch):
+    import delta_visualizer
+    layout = tmp_path / "layout.html"
+    layout.write_text("<script>const port = DELTA_PORT;</script>")
+    monkeypatch.setattr(delta_visualizer, "get_delta_channel", _RecordingChannel)
+
+    first = delta_visualizer.DeltaGraphVisualizer(str(layout))
+    layout.write_text("changed")
+    #The explorer creates a visualizer on every page load
+    second = delta_visualizer.DeltaGraphVisualizer(str(layout))
+    assert second._layout is first._layout
+    monkeypatch.setattr(second._channel, "start", lambda: False)
+    assert second.visualize_graph(Graph(False), None) == "<script>const port = null;</script>"
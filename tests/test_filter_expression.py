@@ -0,0 +1,93 @@
+import itertools
+
+import pytest
+
+from graph_api import Graph, Node
+from filter_expression import ExpressionFilter, FilterExpressionError, parse_expression, _And, _Comparison, _Not, _Or
+
+
+#One vertex for every combination of a, b and c in {0, 1}
+def _graph() -> Graph:
+    g = Graph(False)
+    for i, (a, b, c) in enumerate(itertools.product((0, 1), repeat=3)):
+        node = Node(str(i))
+        node.set_attribute("a", a)
+        node.set_attribute("b", b)
+        node.set_attribute("c", c)
+        g.add_vertex(node)
+    return g
+
+
+#Vertex ids for which check(a, b, c) holds
+def _expected(g: Graph, check) -> set:
+    return {vid for vid, node in g._vertices.items() if check(*(node.get_attributes()[name] for name in "abc"))}
+
+
+def test_and_binds_tighter_than_or():
+    root = parse_expression("a == 1 or b == 1 and c == 1")
+    assert isinstance(root, _Or)
+    assert [type(child) for child in root.children] == [_Comparison, _And]
+
+
+def test_not_binds_to_the_next_factor():
+    root = parse_expression("not a == 1 and b == 1")
+    assert isinstance(root, _And)
+    assert [type(child) for child in root.children] == [_Not, _Comparison]
+    root = parse_expression("NOT not a == 1")
+    assert isinstance(root, _Not) and isinstance(root.child, _Not)
+
+
+def test_parentheses_override_precedence():
+    root = parse_expression("(a == 1 or b == 1) and c == 1")
+    assert isinstance(root, _And)
+    assert [type(child) for child in root.children] == [_Or, _Comparison]
+
+
+@pytest.mark.parametrize("expression, check", [
+    ("a == 1 or b == 1 and c == 1", lambda a, b, c: a == 1 or (b == 1 and c == 1)),
+    ("(a == 1 or b == 1) and c == 1", lambda a, b, c: (a == 1 or b == 1) and c == 1),
+    ("not a == 1 and b == 1", lambda a, b, c: a != 1 and b == 1),
+    ("not (a == 1 and b == 1)", lambda a, b, c: not (a == 1 and b == 1)),
+    ("a == 1 and not (b == 0 or c == 0)", lambda a, b, c: a == 1 and b == 1 and c == 1),
+    ("a >= 1 AND b < 1 OR c != 0", lambda a, b, c: (a >= 1 and b < 1) or c != 0),
+])
+def test_evaluation_matches_python(expression, check):
+    g = _graph()
+    f = ExpressionFilter(expression)
+    expected = _expected(g, check)
+    assert set(f.apply(g._vertices)) == expected
+    #Planned through the indexes, with and without them
+    assert set(f.apply(g._vertices, g)) == expected
+    for name in "abc":
+        g.create_index(name)
+    assert set(f.apply(g._vertices, g)) == expected
+
+
+def test_plans_use_indexes_only_where_they_cover_the_expression():
+    g = _graph()
+    g.create_index("a")
+
+    ids, residual = ExpressionFilter("a == 1 and b == 1")._root.plan(g)
+    assert ids == _expected(g, lambda a, b, c: a == 1)
+    assert residual is not None
+
+    #A disjunct without an index means a scan
+    ids, residual = ExpressionFilter("a == 1 or b == 1")._root.plan(g)
+    assert ids is None and residual is not None
+
+    g.create_index("b")
+    ids, residual = ExpressionFilter("a == 1 or b == 1")._root.plan(g)
+    assert ids == _expected(g, lambda a, b, c: a == 1 or b == 1)
+    assert residual is None
+
+    #Negations and != are always scanned
+    for expression in ("not a == 1", "a != 1"):
+        f = ExpressionFilter(expression)
+        assert not f.uses_index(g)
+        assert f._root.plan(g)[0] is None
+
+
+@pytest.mark.parametrize("expression", ["", "a == 1 and", "(a == 1", "a == 1)", "a 1", "not", "a == 1 b == 1"])
+def test_malformed_expressions_raise(expression):
+    with pytest.raises(FilterExpressionError):
+        ExpressionFilter(expression)
@@ -0,0 +1,105 @@
+from graph_api import Graph, Node
+from graph_platform import Platform
+from filters import EdgeFilter, FilterFilter
+
+
+class _NullVisualizer(object):
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def _mixed_graph() -> Graph:
+    g = Graph(False)
+    for vid, age in [("a", 10), ("b", 40), ("c", "old"), ("d", 35.5), ("e", "young")]:
+        node = Node(vid)
+        node.set_attribute("age", age)
+        g.add_vertex(node)
+    g.add_vertex(Node("f"))
+    return g
+
+
+def _platform(graph: Graph) -> Platform:
+    Platform._instance = None
+    platform = Platform(graph, _NullVisualizer())
+    platform.update_debounce = 0
+    return platform
+
+
+def test_mixed_types_scan_and_index_agree():
+    g = _mixed_graph()
+    #Text from the CLI compares as text with text values, other values only compare within their family
+    for operator, value, expected in [(">", "30", {"b", "c", "d", "e"}), (">", 30, {"b", "d"}), ("<", 30, {"a"}),
+                                      ("==", "old", {"c"}), (">", "m", {"c", "e"}), ("!=", "old", {"a", "b", "d", "e"})]:
+        f = FilterFilter("age", operator, value)
+        scanned = set(f.apply(g._vertices))
+        assert scanned == expected, (operator, value)
+        if operator != "!=":
+            assert set(f.index_ids(g.create_index("age"))) == expected, (operator, value)
+            assert set(f.apply(g._vertices, g)) == expected, (operator, value)
+            g.drop_index("age")
+
+
+def test_not_equal_keeps_values_of_another_type():
+    g = _mixed_graph()
+    #Numbers are never equal to a word, vertices without the attribute still don't match
+    assert set(FilterFilter("age", "!=", "old").apply(g._vertices)) == {"a", "b", "d", "e"}
+    assert set(FilterFilter("age", "!=", 10).apply(g._vertices)) == {"b", "c", "d", "e"}
+
+    numbers = Graph(False)
+    for vid, age in [("a", 10), ("b", 40)]:
+        node = Node(vid)
+        node.set_attribute("age", age)
+        numbers.add_vertex(node)
+    f = FilterFilter("age", "!=", "old")
+    #The numeric column can't take the word, the scan keeps every vertex
+    assert f.mask(numbers.freeze()) is None
+    assert set(f.apply(numbers._vertices, numbers)) == {"a", "b"}
+
+
+def test_mixed_types_incremental_patch_agrees_with_rebuild():
+    g = _mixed_graph()
+    platform = _platform(g)
+    platform.add_filter(FilterFilter("age", ">", 30))
+    assert set(platform._filtered_graph._vertices) == {"b", "d"}
+
+    for vid, age in [("g", "older"), ("h", 31)]:
+        node = Node(vid)
+        node.set_attribute("age", age)
+        platform.add_vertex(node)
+    edited = Node("b")
+    edited.set_attribute("age", "forty")
+    platform.edit_vertex(edited)
+
+    patched = set(platform._filtered_graph._vertices)
+    assert patched == {"d", "h"}
+    assert patched == set(FilterFilter("age", ">", 30).apply(g._vertices))
+
+
+def test_edge_weights_given_as_text_compare_as_numbers():
+    g = Graph(True)
+    for vid in "abcd":
+        g.add_vertex(Node(vid))
+    #As create edge --property weight=10 stores them
+    g.create_edge("a", "b", weight="10")
+    g.create_edge("b", "c", weight="3")
+    g.create_edge("c", "d", weight="heavy")
+
+    #Words still compare as text, like vertex values
+    assert EdgeFilter("weight", ">", "5").edges(g) == {("a", "b"), ("c", "d")}
+    assert EdgeFilter("weight", ">", 5).edges(g) == {("a", "b")}
+    assert EdgeFilter("weight", "<=", 3).edges(g) == {("b", "c")}
+    assert EdgeFilter("weight", "==", "10").edges(g) == {("a", "b")}
+    assert EdgeFilter("weight", "!=", "10").edges(g) == {("b", "c"), ("c", "d")}
+    #Scan and index agree
+    for operator in (">", "<", "==", "!="):
+        f = EdgeFilter("weight", operator, "5")
+        assert f.edges(g) == {(source, target) for source, targets in g._edges.items()
+                                  for target, attrs in targets.items() if f.matches_edge(attrs)}
+
+    #Edges added after the index was built go through the same conversion
+    platform = _platform(g)
+    platform.add_filter(EdgeFilter("weight", ">", 5))
+    platform.create_edge("d", "a", weight="42")
+    platform.create_edge("a", "c", weight="4")
+    assert platform._filtered_graph._allowed_edges == {("a", "b"), ("d", "a")}
+    assert EdgeFilter("weight", ">", 5).edges(g) == {("a", "b"), ("d", "a")}
@@ -0,0 +1,44 @@
+import pytest
+
+from graph_api import Graph, Node
+from graph_platform import Platform
+from filters import Filter
+
+
+class _NullVisualizer(object):
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _BrokenFilter(Filter):
+    def apply(self, vertices: dict, graph=None) -> dict:
+        raise RuntimeError("broken filter")
+
+    def matches(self, node) -> bool:
+        raise RuntimeError("broken filter")
+
+    def serialize(self) -> dict:
+        return {"type": "broken"}
+
+
+def test_debounced_update_errors_are_raised_by_the_next_flush():
+    g = Graph(False)
+    g.add_vertex(Node("a"))
+    Platform._instance = None
+    platform = Platform(g, _NullVisualizer())
+    platform.update_debounce = 0.01
+
+    platform.add_filter(_BrokenFilter())
+    platform._update_timer.join()
+    #The update failed on the timer thread, the view is still pending
+    assert platform._update_pending
+    with pytest.raises(RuntimeError, match="broken filter"):
+        platform.flush_updates()
+    #Raised once, the next flush updates again and fails again
+    with pytest.raises(RuntimeError, match="broken filter"):
+        platform.flush_updates()
+
+    platform.remove_filter(0)
+    platform.flush_updates()
+    assert not platform._update_pending
+    assert set(platform._filtered_graph._vertices) == {"a"}
@@ -0,0 +1,91 @@
+import random
+
+from graph_api import Graph, Node
+from TreeVIew.tree_view import ForestView, _tree_rows
+
+
+#Rows a client has after applying ops to the rows it had
+def _apply(rows: list, ops: list) -> None:
+    for op in ops:
+        if op["op"] == "remove":
+            del rows[op["index"]:op["index"] + op["count"]]
+        elif op["op"] == "insert":
+            rows[op["index"]:op["index"]] = op["rows"]
+        elif op["op"] == "update":
+            rows[op["index"]] = op["row"]
+
+
+def _random_graph(rng: random.Random, directed: bool) -> Graph:
+    g = Graph(directed)
+    g.add_vertices((str(i), {"name": f"n{i}"}) for i in range(40))
+    for _ in range(30):
+        a, b = str(rng.randrange(40)), str(rng.randrange(40))
+        if a != b:
+            g.create_edges([(a, b, {})])
+    return g
+
+
+#One random expansion, collapse, selection or graph change
+def _step(rng: random.Random, g: Graph, forest: ForestView, step: int) -> None:
+    rows = forest.get_rows(0, forest.row_count())
+    r = rng.random()
+    if r < 0.25 and rows:
+        forest.expand_node_by_tree_id(rng.choice(rows)["tree_id"])
+        return
+    if r < 0.35 and rows:
+        forest.collapse_node_by_tree_id(rng.choice(rows)["tree_id"])
+        return
+    if r < 0.4 and g._vertices:
+        forest.select(rng.choice(list(g._vertices)))
+        return
+    if r < 0.55:
+        for _ in range(rng.randrange(1, 4)):
+            a, b = str(rng.randrange(60)), str(rng.randrange(60))
+            if a != b and a in g._vertices and b in g._vertices:
+                g.create_edges([(a, b, {})])
+    elif r < 0.7:
+        sources = [source for source, targets in g._edges.items() if targets]
+        for _ in range(rng.randrange(1, 4)):
+            if sources:
+                source = rng.choice(sources)
+                if g._edges[source]:
+                    g.delete_edge(source, rng.choice(list(g._edges[source])))
+    elif r < 0.8 and g._vertices:
+        node = Node(rng.choice(list(g._vertices)))
+        node.set_attribute("name", f"x{step}")
+        g.edit_vertex(node)
+    elif r < 0.9 and g._vertices:
+        g.delete_vertex(g._vertices[rng.choice(list(g._vertices))])
+    else:
+        vid = str(rng.randrange(60))
+        if vid not in g._vertices:
+            g.add_vertices([(vid, {})])
+    forest.graph_updated()
+
+
+def test_incremental_updates_match_the_forest():
+    for seed in range(12):
+        rng = random.Random(seed)
+        g = _random_graph(rng, seed % 2 == 0)
+        forest = ForestView(g)
+        revision, client_rows = forest.revision, forest.get_rows(0, forest.row_count())
+        for step in range(150):
+            _step(rng, g, forest, step)
+
+            #Roots are the first vertices of the components, in insertion order, whatever was merged or split
+            assert [root.node.get_id() for root in forest.roots] == forest._components.roots(), (seed, step)
+            visible = [tree_node for root in forest.roots for tree_node in _tree_rows(root)]
+            assert forest._visible_rows() == visible, (seed, step)
+            for offset in range(0, len(visible) + 3, 7):
+                assert forest._row_window(offset, offset + 5) == visible[offset:offset + 5], (seed, step)
+            for tree_node in visible:
+                assert tree_node.node is g._vertices[tree_node.node.get_id()], (seed, step)
+                assert tree_node in forest._tree_nodes.showing(tree_node.node.get_id())
+
+            if rng.random() < 0.5:
+                revision, ops = forest.changes_since(revision)
+                if ops is None:
+                    client_rows = forest.get_rows(0, forest.row_count())
+                else:
+                    _apply(client_rows, ops)
+                assert client_rows == forest.get_rows(0, forest.row_count()), (seed, step)